@@ -0,0 +1,75 @@
+import datetime
+import os
+
+import pandas as pd
+import streamlit as st
+
+from app import metrics, storage
+from app.common import get_store
+
+
+def admin_page():
+    view = st.sidebar.radio("Admin view", ["Analytics", "Gate passes", "Performance"], key="admin_view")
+    if view == "Analytics":
+        from app.analytics import analytics_page
+        analytics_page()
+    elif view == "Gate passes":
+        gate_passes_page()
+    else:
+        performance_page()
+
+
+def gate_passes_page():
+    from app.teacher import export_passes
+
+    st.title("Admin: Gate Passes")
+    st.caption("Every mentor's granted passes, for printing or handing to the gate in bulk.")
+    export_passes()
+
+
+def performance_page():
+    st.title("Admin: Performance Metrics")
+    st.caption(f"Collected in this server process (pid {os.getpid()}) since it started or was last reset, across all sessions.")
+
+    st.subheader("Latency by operation")
+    latencies = metrics.REGISTRY.latencies()
+    if latencies:
+        st.dataframe(pd.DataFrame(latencies).round(3), hide_index=True)
+        st.caption(f"Percentiles cover each operation's last {metrics.RECENT} calls; calls and total cover everything.")
+    else:
+        st.info("Nothing has been timed yet.")
+
+    st.subheader("Caches and rows scanned")
+    counters = metrics.REGISTRY.counters()
+    if counters:
+        st.dataframe(pd.DataFrame([{"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+                                   for name, labels, value in counters]), hide_index=True)
+
+    st.subheader("Export")
+    st.download_button("Download Prometheus metrics", data=metrics.REGISTRY.prometheus_text(),
+                       file_name="leave_metrics.prom", mime="text/plain")
+    if metrics.METRICS_FILE:
+        st.write(f"Also written every {metrics.WRITE_INTERVAL}s to `{metrics.METRICS_FILE}`.")
+    else:
+        st.caption("Set LEAVE_METRICS_FILE to have the server keep a Prometheus text file up to date.")
+    if metrics.PROFILE_DIR:
+        st.write(f"Profiling every rerun into `{metrics.PROFILE_DIR}` (open the .prof files with snakeviz or pstats).")
+    else:
+        st.caption("Set LEAVE_PROFILE_DIR to dump a cProfile of every rerun.")
+
+    if st.button("Reset metrics", key="metrics_reset"):
+        metrics.REGISTRY.reset()
+        st.rerun()
+
+    st.subheader("Storage")
+    store = get_store()
+    st.caption(f"Decided requests move to the Parquet archive in `{store.archive.path}` "
+               f"{storage.ARCHIVE_AFTER_DAYS} days after their leave ends (`python -m app.storage archive`).")
+    if st.button("Archive now", key="archive_now"):
+        cutoff = datetime.date.today() - datetime.timedelta(days=storage.ARCHIVE_AFTER_DAYS)
+        with st.spinner("Archiving..."):
+            moved = store.archive_decided(cutoff)
+        st.success(f"Archived {moved} decided request(s) that ended before {cutoff}.")
+    col1, col2 = st.columns(2)
+    col1.metric("Live requests", len(store.load()))
+    col2.metric("Archived requests", store.archive.count_rows())
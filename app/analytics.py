@@ -0,0 +1,64 @@
+import datetime
+
+import streamlit as st
+
+from app import metrics, rollups
+from app.common import get_store
+
+GROUPINGS = {"branch": "Branch", "batch": "Batch", "teacher": "Mentor"}
+
+
+def analytics_page():
+    # Every number here comes from the rollup tables, never from the requests themselves.
+    st.title("Admin: Leave Analytics")
+    store = get_store()
+    summary = store.rollups
+
+    with metrics.timed("page.analytics.totals"):
+        totals = summary.totals()
+    cols = st.columns(len(totals) + 1)
+    cols[0].metric("All requests", sum(totals.values()))
+    for col, (status, n) in zip(cols[1:], totals.items()):
+        col.metric(status, n)
+
+    st.subheader("Requests by group")
+    by = st.radio("Group by", list(GROUPINGS), format_func=GROUPINGS.get, horizontal=True, key="analytics_by")
+    table = summary.counts(by).sort_values("Total", ascending=False)
+    table.index.name = GROUPINGS[by]
+    st.dataframe(table)
+
+    st.subheader("Requests per day")
+    today = datetime.date.today()
+    days = st.date_input("Submitted between", (today - datetime.timedelta(days=30), today), key="analytics_days")
+    if len(days) == 2:
+        daily = summary.counts("day", *days).drop(columns="Total")
+        if daily.empty:
+            st.info("No requests were submitted in that range.")
+        else:
+            st.bar_chart(daily)
+
+    st.subheader("Time to a decision")
+    latency = summary.latency()
+    if latency.empty:
+        st.info("No decisions with a recorded submission time yet.")
+    else:
+        decided = latency["decided"].sum()
+        mean_hours = (latency["mean_hours"] * latency["decided"]).sum() / decided
+        c1, c2 = st.columns(2)
+        c1.metric("Decisions timed", int(decided))
+        c2.metric("Mean wait (hours)", f"{mean_hours:.1f}")
+        st.dataframe(latency.rename(columns={"teacher": "Mentor"}), hide_index=True)
+
+    st.subheader(f"Applicants with attendance below {rollups.LOW_ATTENDANCE:.0f}%")
+    low = summary.low_attendance()
+    if low.empty:
+        st.info("Nobody has applied with low attendance.")
+    else:
+        st.dataframe(low, hide_index=True)
+
+    st.caption(f"Read from the rollups in `{summary.path}`, updated on every submit and decision "
+               f"(last rebuilt {summary.built_at() or 'never'}).")
+    if st.button("Rebuild rollups", key="rollups_rebuild"):
+        with st.spinner("Recounting every request..."):
+            n = summary.rebuild(store.load_all())
+        st.success(f"Rebuilt the rollups from {n} requests.")
@@ -0,0 +1,177 @@
+import functools
+import operator
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from app import metrics, storage
+
+ARCHIVE_DIR = os.environ.get("LEAVE_ARCHIVE_DIR", "leave_archive")
+
+TYPES = {"attendance": pa.float32(), "leave_days": pa.int16(), "start_date": pa.date32(), "end_date": pa.date32()}
+SCHEMA = pa.schema([(col, TYPES.get(col, pa.string())) for col in storage.COLUMNS])
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string()), ("teacher", pa.string())]), flavor="hive")
+# Given explicitly so files written before a column was added read it as null
+DATASET_SCHEMA = SCHEMA.append(pa.field("month", pa.string()))
+VIEW_CACHE_ENTRIES = 256
+
+
+class Archive:
+    """
+    Decided requests that have ended, moved out of the live store into Parquet files
+    partitioned by leave month and mentor (`month=2025-01/teacher=DJ/part-*.parquet`).
+    Files are never modified in place, only replaced. Reads memory-map them and push the
+    column list and row filter down to the Parquet reader, so a mentor's history only
+    opens that mentor's partitions and a date range skips whole months. Each partition
+    is kept as a single file. A student's rows can be in any partition, so a map from
+    student_id to the files holding them is built once per generation and a student's
+    history opens only those. Recently read views are kept until the next write by any
+    process.
+    """
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        self.marker_path = os.path.join(path, "_generation")  # "_" files are skipped by discovery
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._dataset = None
+        self._generation = None
+        self._views = {}  # (view, key) -> frame, for the current generation
+        self._students = None  # student_id -> files, for the current generation
+
+    def _current(self):
+        """The dataset as of the last write by any process, or None while the archive is empty."""
+        try:
+            generation = os.stat(self.marker_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if generation != self._generation:
+            self._dataset = ds.dataset(os.path.abspath(self.path), format="parquet", partitioning=PARTITIONING,
+                                       schema=DATASET_SCHEMA, filesystem=self._filesystem)
+            self._generation = generation
+            self._views = {}
+            self._students = None
+        return self._dataset
+
+    def _student_files(self, dataset):
+        if self._students is None:
+            students = {}
+            for fragment in dataset.get_fragments():
+                column = fragment.to_table(schema=DATASET_SCHEMA, columns=["student_id"])["student_id"]
+                for student_id in pc.unique(column).to_pylist():
+                    students.setdefault(student_id, []).append(fragment.path)
+            self._students = students
+        return self._students
+
+    def _scan(self, dataset, filter, columns, student_id):
+        if student_id is not None:
+            files = self._student_files(dataset).get(student_id)
+            if not files:
+                return None
+            dataset = ds.dataset(files, format="parquet", partitioning=PARTITIONING, schema=DATASET_SCHEMA,
+                                 partition_base_dir=os.path.abspath(self.path), filesystem=self._filesystem)
+        return dataset.to_table(columns=columns or storage.COLUMNS, filter=filter)
+
+    def _partition_files(self, table):
+        """The files of every partition that rows of `table` belong in."""
+        dataset = self._current()
+        if dataset is None:
+            return []
+        pairs = set(zip(table["month"].to_pylist(), table["teacher"].to_pylist()))
+        hit = functools.reduce(operator.or_, ((ds.field("month") == month) & (ds.field("teacher") == teacher)
+                                              for month, teacher in pairs))
+        return [fragment.path for fragment in dataset.get_fragments(filter=hit)]
+
+    def write(self, df):
+        """
+        Add the rows of a store frame. Returns the number written. Every partition the
+        rows land in is rewritten as a single file, old rows and new; the files it
+        replaces are removed once the new generation is visible.
+        """
+        if df.empty:
+            return 0
+        plain = df[storage.COLUMNS].astype({col: object for col in storage.CATEGORY_COLUMNS})
+        table = pa.Table.from_pandas(plain, schema=SCHEMA, preserve_index=False)
+        month = df["start_date"].dt.strftime("%Y-%m").fillna("unknown").to_numpy(dtype=object)
+        table = table.append_column("month", pa.array(month, pa.string()))
+        with metrics.timed("archive.write"):
+            replaced = self._partition_files(table)
+            if replaced:
+                previous = ds.dataset(replaced, format="parquet", partitioning=PARTITIONING, schema=DATASET_SCHEMA,
+                                      partition_base_dir=os.path.abspath(self.path), filesystem=self._filesystem)
+                table = pa.concat_tables([previous.to_table(), table])
+            ds.write_dataset(table, self.path, format="parquet", partitioning=PARTITIONING,
+                             basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                             existing_data_behavior="overwrite_or_ignore")
+            with open(self.marker_path, "a"):
+                pass
+            os.utime(self.marker_path)
+            for path in replaced:
+                os.unlink(path)
+        return len(df)
+
+    def read(self, filter=None, columns=None, student_id=None):
+        """
+        Archived rows matching the pyarrow expression `filter`, only looking in the files
+        holding `student_id` when that is given. Without `columns` this is a typed store
+        frame; with them, just those columns as they are on disk.
+        """
+        dataset, table = self._current(), None
+        if dataset is not None:
+            with metrics.timed("archive.read"):
+                try:
+                    table = self._scan(dataset, filter, columns, student_id)
+                except FileNotFoundError:
+                    # another process rewrote a partition since we listed the files
+                    self._generation = None
+                    table = self._scan(self._current(), filter, columns, student_id)
+        if table is None:
+            empty = pd.DataFrame({col: pd.Series(dtype=object) for col in columns or storage.COLUMNS})
+            return empty if columns else storage.coerce_frame(empty)
+        metrics.count("rows_fetched", table.num_rows, source="archive")
+        df = table.to_pandas(date_as_object=False)
+        if columns:
+            return df
+        for col in storage.DATE_COLUMNS:
+            df[col] = df[col].astype("datetime64[ns]")
+        # a retried archive run can write a row twice; the copies are identical
+        return storage.coerce_frame(df).drop_duplicates("req_id", ignore_index=True)
+
+    def view(self, view, key):
+        """One view's archived rows. The frame is shared between callers; don't modify it."""
+        self._current()
+        if (view, key) not in self._views:
+            if view == "student":
+                df = self.read(ds.field("student_id") == key, student_id=key)
+            elif view == "teacher_history":
+                df = self.read(ds.field("teacher") == key)
+            else:
+                raise ValueError(f"Nothing in view {view!r} is ever archived")
+            if len(self._views) >= VIEW_CACHE_ENTRIES:
+                del self._views[next(iter(self._views))]
+            self._views[view, key] = df
+            metrics.count("cache_requests", cache="archive_view", result="miss")
+        else:
+            metrics.count("cache_requests", cache="archive_view", result="hit")
+        return self._views[view, key]
+
+    def granted_between(self, start, end, teacher=None):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        hit = (
+            (ds.field("month") <= end.strftime("%Y-%m"))  # prunes whole partitions
+            & (ds.field("status") == storage.LEAVE_STATUS_GRANTED)
+            & (ds.field("start_date") <= pa.scalar(end.date(), pa.date32()))
+            & (ds.field("end_date") >= pa.scalar(start.date(), pa.date32()))
+        )
+        if teacher:
+            hit &= ds.field("teacher") == teacher
+        return self.read(hit)
+
+    def count_rows(self):
+        dataset = self._current()
+        return dataset.count_rows() if dataset is not None else 0
+
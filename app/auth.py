@@ -0,0 +1,201 @@
+import collections
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+from app import metrics
+
+CREDENTIALS_FILE = os.environ.get("LEAVE_CREDENTIALS", "credentials.json")
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+
+
+def hash_password(password, salt=None, **params):
+    params = {**SCRYPT_PARAMS, **params}
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, dklen=32, **params)
+    return {"salt": salt.hex(), "hash": digest.hex(), **params}
+
+
+class RateLimiter:
+    """
+    Sliding-window failure counters, checked before any hash work is done. A key whose
+    failures have all left the window is dropped, and at most `max_keys` are kept (the
+    least recently failed go first), so guessing at many IDs can't grow it without end.
+    """
+
+    def __init__(self, max_failures=5, window=300, max_keys=10000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = collections.OrderedDict()  # key -> deque of failure times, oldest key first
+        self._lock = threading.Lock()
+
+    def retry_after(self, key):
+        """Seconds until `key` may try again, 0 if it may try now."""
+        with self._lock:
+            failures = self._failures.get(key)
+            if failures is None:
+                return 0
+            cutoff = time.monotonic() - self.window
+            while failures and failures[0] < cutoff:
+                failures.popleft()
+            if not failures:
+                del self._failures[key]
+                return 0
+            if len(failures) < self.max_failures:
+                return 0
+            return int(failures[0] - cutoff) + 1
+
+    def failed(self, key):
+        with self._lock:
+            now = time.monotonic()
+            failures = self._failures.setdefault(key, collections.deque(maxlen=self.max_failures))
+            failures.append(now)
+            self._failures.move_to_end(key)
+            # keys are in order of their last failure, so the expired ones are at the front
+            cutoff = now - self.window
+            while self._failures and (len(self._failures) > self.max_keys
+                                      or next(iter(self._failures.values()))[-1] < cutoff):
+                self._failures.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+class CredentialStore:
+    """
+    Users from `credentials.json`, indexed by login ID. Passwords are salted scrypt
+    hashes compared in constant time; a successful check is remembered as a keyed
+    HMAC so repeat logins skip the slow hash. An unknown ID is hashed against a dummy
+    record, so it takes as long to refuse as a wrong password. The file is re-read
+    when it changes, so onboarding someone is an edit, not a redeploy.
+    """
+
+    def __init__(self, path=CREDENTIALS_FILE, cache_size=1024):
+        self.path = path
+        self.limiter = RateLimiter()  # per (ID, client): a wrong password locks out its client only
+        self.client_limiter = RateLimiter(max_failures=20)  # per client, across every ID it tries
+        self._dummy = hash_password(secrets.token_hex(16))
+        self._users = {}
+        self._mtime = None
+        self._verified = collections.OrderedDict()
+        self._cache_size = cache_size
+        self._cache_key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        users = {}
+        if mtime is not None:
+            with open(self.path, encoding="utf-8") as fh:
+                users = json.load(fh)["users"]
+        with self._lock:
+            self._users, self._mtime = users, mtime
+            self._verified.clear()
+
+    def get(self, user_id):
+        return self._users.get(user_id)
+
+    def all(self):
+        return dict(self._users)
+
+    def _check(self, user, user_id, password):
+        fast_key = hmac.new(self._cache_key, f"{user_id}\0{password}\0{user['hash']}".encode("utf-8"), "sha256").digest()
+        with self._lock:
+            if fast_key in self._verified:
+                self._verified.move_to_end(fast_key)
+                metrics.count("cache_requests", cache="credentials", result="hit")
+                return True
+        metrics.count("cache_requests", cache="credentials", result="miss")
+        params = {k: user[k] for k in SCRYPT_PARAMS}
+        with metrics.timed("auth.scrypt"):
+            expected = hash_password(password, bytes.fromhex(user["salt"]), **params)["hash"]
+        if not hmac.compare_digest(expected, user["hash"]):
+            return False
+        with self._lock:
+            self._verified[fast_key] = True
+            if len(self._verified) > self._cache_size:
+                self._verified.popitem(last=False)
+        return True
+
+    def verify(self, user_id, password, role, client_key=None):
+        """
+        Returns (user, retry_after). `user` is the user's record when the ID, password
+        and role all match. `retry_after` > 0 means the attempt was refused unchecked
+        because this client has failed too often recently, on this ID or on any.
+        """
+        self.refresh()
+        user = self.get(user_id)
+        limits = [(self.client_limiter, client_key)] if client_key else []
+        if user is not None:  # IDs that don't exist get no bucket of their own
+            limits.append((self.limiter, (user_id, client_key)))
+        wait = max([limiter.retry_after(key) for limiter, key in limits], default=0)
+        if wait:
+            return None, wait
+
+        ok = self._check(user or self._dummy, user_id, password)
+        if ok and user is not None and user.get("role") == role:
+            # the client's own bucket stays: logging in somewhere doesn't buy more guesses
+            self.limiter.reset((user_id, client_key))
+            return user, 0
+        for limiter, key in limits:
+            limiter.failed(key)
+        return None, 0
+
+
+def _save(path, users):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump({"users": users}, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(description="Manage portal logins")
+    parser.add_argument("command", choices=["add", "passwd", "remove", "list"])
+    parser.add_argument("--id", dest="user_id")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--role", choices=["student", "teacher", "admin", "gate"], default="teacher")
+    parser.add_argument("--path", default=CREDENTIALS_FILE)
+    args = parser.parse_args()
+
+    users = {}
+    if os.path.exists(args.path):
+        with open(args.path, encoding="utf-8") as fh:
+            users = json.load(fh)["users"]
+
+    if args.command == "list":
+        for user_id, user in sorted(users.items()):
+            print(f"{user_id:<16} {user['role']:<8} {user.get('name', '')}")
+    elif not args.user_id:
+        parser.error("--id is required")
+    elif args.command == "remove":
+        users.pop(args.user_id, None)
+        _save(args.path, users)
+    else:
+        if args.command == "passwd" and args.user_id not in users:
+            parser.error(f"No such user: {args.user_id}")
+        user = users.get(args.user_id, {"role": args.role})
+        if args.name:
+            user["name"] = args.name
+        if user["role"] == "teacher" and not user.get("name"):
+            parser.error("Teachers need a --name (it's how requests are routed to them)")
+        user.update(hash_password(getpass.getpass(f"Password for {args.user_id}: ")))
+        users[args.user_id] = user
+        _save(args.path, users)
+        print(f"Saved {args.user_id}")
@@ -0,0 +1,49 @@
+import numpy as np
+
+from app import metrics, storage
+
+
+class LiveView:
+    """
+    One view of the store (say, a mentor's pending queue) kept in memory and brought up
+    to date from the store's change feed. `refresh()` is cheap when nothing changed: one
+    version check. Otherwise only the rows written since the last refresh are fetched
+    and patched in; a full reload happens only when the feed no longer reaches back far
+    enough (after a compaction, or a long idle).
+    """
+
+    def __init__(self, store, view, key):
+        self.store = store
+        self.view = view
+        self.key = key
+        self.reload()
+
+    def reload(self):
+        # Version first: anything written while we load is replayed by the next refresh
+        self.version = self.store.version()
+        self.frame = storage.index_by_id(self.store.view(self.view, self.key))
+
+    def refresh(self):
+        """Apply the changes since the last refresh. Returns the req_ids that joined the view."""
+        if self.store.version() == self.version:
+            metrics.count("live_refresh", result="unchanged")
+            return []
+        version, changed = self.store.changes_since(self.version)
+        if changed is None:
+            metrics.count("live_refresh", result="reload")
+            before = set(self.frame.index)
+            self.reload()
+            return [req_id for req_id in self.frame.index if req_id not in before]
+
+        metrics.count("live_refresh", result="delta")
+        changed = storage.index_by_id(changed)
+        kept = self.frame.drop(index=changed.index, errors="ignore")
+        matching = changed.loc[self.store._view_mask(changed, self.view, self.key)]
+        joined = [req_id for req_id in matching.index if req_id not in self.frame.index]
+        self.frame = storage.concat_frames(kept, matching) if not matching.empty else kept
+        self.version = version
+        return joined
+
+    def page(self, offset=0, limit=25, sort_by=None, ascending=True):
+        """Same contract as `LeaveStore.page`, served from memory."""
+        return storage.slice_sorted(self.frame, np.arange(len(self.frame)), offset, limit, sort_by, ascending)
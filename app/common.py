@@ -0,0 +1,86 @@
+import pandas as pd
+import streamlit as st
+
+from app import changefeed, metrics, storage
+from app import directory as campus_directory
+
+DATABASE = storage.DATABASE
+LEAVE_STATUS_PENDING = storage.LEAVE_STATUS_PENDING
+LEAVE_STATUS_GRANTED = storage.LEAVE_STATUS_GRANTED
+LEAVE_STATUS_REJECTED = storage.LEAVE_STATUS_REJECTED
+LEAVE_STATUS_REVOKED = storage.LEAVE_STATUS_REVOKED
+PAGE_SIZES = [10, 25, 50, 100]
+DATE_COLUMN_CONFIG = {col: st.column_config.DateColumn(format="YYYY-MM-DD") for col in storage.DATE_COLUMNS}
+
+
+@st.cache_resource
+def get_directory():
+    return campus_directory.Directory()
+
+
+@st.cache_resource
+def get_store():
+    return storage.open_store(path=DATABASE)
+
+
+@metrics.timed("app.save_leave_request")
+def save_leave_request(new_req): 
+    try:
+        get_store().append(new_req)
+        return True
+    except Exception as e:
+        st.error(f"Couldn't save your request: {e}")
+        return False
+
+
+def live_view(view, key):
+    # This session's copy of one view, patched from the change feed instead of re-read.
+    # Returns the view and the req_ids that joined it since the last call.
+    state_key = f"live_{view}_{key}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = changefeed.LiveView(get_store(), view, key)
+        return st.session_state[state_key], []
+    live = st.session_state[state_key]
+    return live, live.refresh()
+
+
+def paged_view(name, view, key, sort_keys, title=None, live=None):
+    # Reads the paging widgets' state from the last rerun, fetches just that slice from
+    # the store (or from `live`, a changefeed.LiveView), then draws the controls under
+    # a title only if there's anything to show.
+    fetch = live.page if live is not None else lambda **kw: get_store().page(view, key, **kw)
+    state = st.session_state
+    size = state.get(f"{name}_size", PAGE_SIZES[0])
+    sort_by = state.get(f"{name}_sort", sort_keys[0])
+    ascending = not state.get(f"{name}_desc", False)
+    page_no = state.get(f"{name}_page", 1)
+
+    with metrics.timed(f"filter.{view}"):
+        rows, total = fetch(offset=(page_no - 1) * size, limit=size, sort_by=sort_by, ascending=ascending)
+    n_pages = max(1, -(-total // size))
+    if page_no > n_pages:
+        page_no = state[f"{name}_page"] = n_pages
+        rows, total = fetch(offset=(page_no - 1) * size, limit=size, sort_by=sort_by, ascending=ascending)
+    if total == 0:
+        return rows, total
+
+    if title:
+        st.write(title)
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.selectbox("Rows per page", PAGE_SIZES, key=f"{name}_size")
+    with c2:
+        st.selectbox("Sort by", sort_keys, key=f"{name}_sort", format_func=lambda col: col.replace("_", " ").title())
+    with c3:
+        st.toggle("Descending", key=f"{name}_desc")
+    with c4:
+        # label and bounds are part of the widget's identity: anything that changes with the
+        # row count would reset it to page 1 whenever a request arrives; clamped above instead
+        st.number_input("Page", min_value=1, key=f"{name}_page")
+    offset = (page_no - 1) * size
+    st.caption(f"Page {page_no} of {n_pages} · showing {offset + 1}–{offset + len(rows)} of {total}")
+    return rows, total
+
+
+def fmt_date(value):
+    return value.strftime("%Y-%m-%d") if pd.notna(value) else "?"
@@ -0,0 +1,64 @@
+import pandas as pd
+
+
+def normalize_reason(reason):
+    return str(reason).strip().lower()
+
+
+def reason_keys(reasons):
+    return reasons.fillna("").astype(str).str.strip().str.lower()
+
+
+def find_overlaps(reqs, start, end, reason):
+    """
+    Rows of `reqs` whose [start_date, end_date] overlaps [start, end] and whose reason
+    matches `reason` once normalized. Works on the pre-parsed columns, no row loop.
+    """
+    if reqs.empty:
+        return reqs
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    hits = (
+        (reqs["reason_key"] == normalize_reason(reason))
+        & (reqs["start_date"] <= end)
+        & (reqs["end_date"] >= start)
+    )
+    return reqs.loc[hits]
+
+
+def find_duplicates(df, statuses=None):
+    """
+    One pass over the whole dataset: within each (student_id, reason_key) group, sorted
+    by start date, a request that starts on or before the latest end date seen so far
+    overlaps an earlier one. Overlapping runs share a `dup_cluster` number; only
+    clusters with more than one request are returned.
+    """
+    if statuses is not None:
+        df = df.loc[df["status"].isin(statuses)]
+    df = df.dropna(subset=["start_date", "end_date"]).sort_values(["student_id", "reason_key", "start_date"], kind="stable")
+    if df.empty:
+        return df.assign(dup_cluster=pd.Series(dtype=int))
+
+    keys = [df["student_id"], df["reason_key"]]
+    prev_max_end = df.groupby(keys, sort=False)["end_date"].cummax().groupby(keys, sort=False).shift()
+    starts_cluster = ~(df["start_date"] <= prev_max_end)
+    df = df.assign(dup_cluster=starts_cluster.cumsum())
+    sizes = df.groupby("dup_cluster")["dup_cluster"].transform("size")
+    return df.loc[sizes > 1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app import storage
+
+    parser = argparse.ArgumentParser(description="Scan all leave requests for overlapping duplicates")
+    parser.add_argument("--all-statuses", action="store_true", help="include decided requests too, archived ones included")
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=None)
+    args = parser.parse_args()
+
+    store = storage.open_store(args.backend)
+    all_reqs = store.load_all() if args.all_statuses else store.load()
+    dups = find_duplicates(all_reqs, None if args.all_statuses else [storage.LEAVE_STATUS_PENDING])
+    cols = ["dup_cluster", "req_id", "student_id", "start_date", "end_date", "status", "reason"]
+    print(dups[cols].to_string(index=False) if not dups.empty else "No duplicate leave requests found.")
+    print(f"{dups['dup_cluster'].nunique()} duplicate group(s) across {len(all_reqs)} requests")
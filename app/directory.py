@@ -0,0 +1,85 @@
+import collections
+import json
+import logging
+import os
+import threading
+
+DIRECTORY_FILE = os.environ.get("LEAVE_DIRECTORY", "directory.json")
+
+log = logging.getLogger(__name__)
+
+
+class DirectoryIndex:
+    """One immutable load of the branch -> batch -> mentor table, with every lookup precomputed."""
+
+    def __init__(self, branches):
+        self.branches = list(branches)
+        self.branch_batches = {branch: list(batches) for branch, batches in branches.items()}
+        self.batch_mentor = {}
+        self.batch_branch = {}
+        mentor_batches = collections.defaultdict(list)
+        for branch, batches in branches.items():
+            for batch, mentor in batches.items():
+                if batch in self.batch_mentor:
+                    raise ValueError(f"Batch {batch!r} is listed under both {self.batch_branch[batch]!r} and {branch!r}")
+                self.batch_mentor[batch] = mentor
+                self.batch_branch[batch] = branch
+                mentor_batches[mentor].append(batch)
+        self.mentor_batches = dict(mentor_batches)
+        self.mentors = list(self.mentor_batches)
+
+    def batches_for(self, branch):
+        return self.branch_batches.get(branch, [])
+
+    def mentor_for(self, batch):
+        return self.batch_mentor.get(batch)
+
+    def batches_of(self, mentor):
+        return self.mentor_batches.get(mentor, [])
+
+
+class Directory:
+    """
+    Keeps the parsed directory for the whole server process and re-reads the file
+    only when its mtime changes, so edits go live on the next rerun without a restart.
+    A broken edit is logged and the last good version stays in use.
+    """
+
+    def __init__(self, path=DIRECTORY_FILE):
+        self.path = path
+        self._index = DirectoryIndex({})
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            log.warning("Directory file %s not found", self.path)
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    self._index = DirectoryIndex(json.load(fh)["branches"])
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                log.warning("Couldn't reload %s, keeping the previous directory: %s", self.path, e)
+            self._mtime = mtime
+
+    def current(self):
+        self.refresh()
+        return self._index
+
+
+if __name__ == "__main__":
+    from app import auth
+
+    index = Directory().current()
+    teacher_names = {user.get("name") for user in auth.CredentialStore().all().values() if user.get("role") == "teacher"}
+    for mentor in index.mentors:
+        missing = "" if mentor in teacher_names else "   <- no teacher login with this name"
+        print(f"{mentor:<20} {', '.join(index.batches_of(mentor))}{missing}")
@@ -0,0 +1,68 @@
+import datetime
+import time
+
+import pandas as pd
+import streamlit as st
+
+from app import gatepass
+from app.common import fmt_date, get_store
+
+LOG_ROWS = 200  # scans kept in this session's log
+
+
+def get_pass_index(today):
+    # One index per gate session and day; passes that ended yesterday fall out at midnight.
+    key = f"pass_index_{today.isoformat()}"
+    if key not in st.session_state:
+        st.session_state[key] = gatepass.PassIndex(get_store(), today)
+    return st.session_state[key]
+
+
+def check_scan(payload, index, today):
+    started = time.perf_counter()
+    ok, reason, row = gatepass.verify(payload, index, today)
+    micros = (time.perf_counter() - started) * 1e6
+    entry = {
+        "time": datetime.datetime.now().strftime("%H:%M:%S"),
+        "result": "✅ valid" if ok else "⛔ refused",
+        "student_id": row["student_id"] if row else None,
+        "student_name": row["student_name"] if row else None,
+        "leave": f"{fmt_date(row['start_date'])} to {fmt_date(row['end_date'])}" if row else None,
+        "reason": reason,
+        "µs": round(micros),
+    }
+    st.session_state.gate_log = ([entry] + st.session_state.get("gate_log", []))[:LOG_ROWS]
+    return ok, entry
+
+
+def gate_page():
+    st.title("Gate: Verify Leave Passes")
+    today = datetime.date.today()
+    index = get_pass_index(today)
+
+    # A USB/Bluetooth scanner types the QR text and presses Enter, which submits the form
+    with st.form("gate_scan_form", clear_on_submit=True):
+        payload = st.text_input("Scan or paste a gate pass", key="gate_scan")
+        submitted = st.form_submit_button("Verify")
+    if submitted and payload.strip():
+        ok, entry = check_scan(payload, index, today)
+        if ok:
+            st.success(f"**ALLOW** {entry['student_name']} ({entry['student_id']}), on leave {entry['leave']}.")
+        else:
+            st.error(f"**STOP** {entry['reason']}")
+
+    with st.expander("Verify a batch of scans"):
+        batch = st.text_area("One scanned pass per line", key="gate_batch")
+        if st.button("Verify all", key="gate_verify_all") and batch.strip():
+            results = [check_scan(line, index, today) for line in batch.splitlines() if line.strip()]
+            valid = sum(ok for ok, _ in results)
+            st.write(f"{valid} of {len(results)} passes valid.")
+            st.dataframe(pd.DataFrame([entry for _, entry in results]), hide_index=True)
+
+    st.subheader("Recent scans")
+    if st.session_state.get("gate_log"):
+        st.dataframe(pd.DataFrame(st.session_state.gate_log), hide_index=True)
+    else:
+        st.info("Nothing scanned yet.")
+    st.caption(f"{len(index)} passes valid today or later. Signatures are checked with the server's key; "
+               "revoked passes are refused from the next scan on.")
@@ -0,0 +1,132 @@
+import datetime
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import tempfile
+import threading
+
+import pandas as pd
+
+from app import changefeed, metrics
+
+SECRET_FILE = os.environ.get("GATEPASS_SECRET_FILE", "gatepass_secret.key")
+SIGNATURE_CHARS = 32  # HMAC-SHA256 cut to 128 bits, to keep the QR code small
+VALID_PASSES_VIEW = "valid_passes"
+_secret_lock = threading.Lock()  # lru_cache lets concurrent first calls all run; sessions are threads
+
+
+@functools.lru_cache(maxsize=1)
+def _secret():
+    # GATEPASS_SECRET wins; otherwise a key generated on first use and kept next to the data
+    # so every server process (and the bench) signs with the same one.
+    if os.environ.get("GATEPASS_SECRET"):
+        return os.environ["GATEPASS_SECRET"].encode("utf-8")
+    with _secret_lock:
+        return _load_or_create_secret()
+
+
+def _load_or_create_secret():
+    # Written to a private temp file and linked into place, so other processes see either
+    # no key file or a complete one; whoever links first wins and the rest read its key.
+    if os.path.exists(SECRET_FILE):
+        with open(SECRET_FILE, encoding="utf-8") as fh:
+            return fh.read().strip().encode("utf-8")
+    key = secrets.token_hex(32)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(SECRET_FILE) + ".",
+                                    dir=os.path.dirname(os.path.abspath(SECRET_FILE)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(key + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.link(tmp_path, SECRET_FILE)
+    except FileExistsError:
+        with open(SECRET_FILE, encoding="utf-8") as fh:
+            key = fh.read().strip()
+    finally:
+        os.unlink(tmp_path)
+    return key.encode("utf-8")
+
+
+def _signature(body):
+    return hmac.new(_secret(), body.encode("utf-8"), hashlib.sha256).hexdigest()[:SIGNATURE_CHARS]
+
+
+def build_payloads(reqs):
+    """
+    The QR text for each approved row of `reqs`, all sharing one approval timestamp:
+    `LEAVE_GRANTED_ID:..|NAME:..|FROM:..|TO:..|TS:..|PASS:<req_id>|SIG:<hmac>`.
+    """
+    ts = datetime.datetime.now().timestamp()
+    bodies = ("LEAVE_GRANTED_ID:" + reqs["student_id"].astype(str) +
+              "|NAME:" + reqs["student_name"].astype(str) +
+              "|FROM:" + reqs["start_date"].dt.strftime("%Y-%m-%d") +
+              "|TO:" + reqs["end_date"].dt.strftime("%Y-%m-%d") +
+              f"|TS:{ts}" +
+              "|PASS:" + reqs["req_id"].astype(str))
+    return bodies + "|SIG:" + bodies.map(_signature)
+
+
+def parse(payload):
+    """The fields of a payload's signed part, or None if the signature is missing or wrong."""
+    body, sep, signature = payload.strip().rpartition("|SIG:")
+    # compare_digest raises on non-ASCII str, and scanners do produce garbage; compare bytes
+    if not sep or not hmac.compare_digest(signature.encode("utf-8"), _signature(body).encode("utf-8")):
+        return None
+    return dict(part.partition(":")[::2] for part in body.split("|"))
+
+
+class PassIndex:
+    """
+    Every granted pass that hasn't ended yet, by pass id (req_id), for the gate. It's
+    a changefeed.LiveView of the "valid_passes" view plus a plain dict over it, and is
+    brought up to date before every lookup, so a pass revoked or re-issued a moment
+    ago is already gone from it. When nothing changed that's one version check.
+    """
+
+    COLUMNS = ["student_id", "student_name", "start_date", "end_date", "teacher", "qr_code_data"]
+
+    def __init__(self, store, day):
+        self.day = day
+        self.live = changefeed.LiveView(store, VALID_PASSES_VIEW, day.isoformat())
+        self._rebuild()
+
+    def _rebuild(self):
+        frame = self.live.frame
+        self.version = self.live.version
+        self.by_id = dict(zip(frame.index, frame[self.COLUMNS].to_dict("records")))
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, pass_id):
+        self.live.refresh()
+        if self.live.version != self.version:
+            self._rebuild()
+        return self.by_id.get(pass_id)
+
+
+def verify(payload, index, today):
+    """
+    Check a scanned gate pass. Returns (ok, reason, row); `row` is the pass as the store
+    has it, when the payload was signed by us and still names a current pass.
+    """
+    with metrics.timed("gate.verify"):
+        fields = parse(payload)
+        if fields is None:
+            metrics.count("gate_scans", result="bad_signature")
+            return False, "Not a genuine gate pass (signature missing or doesn't match).", None
+        row = index.get(fields.get("PASS"))
+        if row is None:
+            metrics.count("gate_scans", result="not_valid")
+            return False, "This pass has been revoked, has expired, or was never granted.", None
+        if row["qr_code_data"] != payload.strip():
+            metrics.count("gate_scans", result="superseded")
+            return False, "This pass was replaced by a newer one for the same request.", row
+        if row["start_date"] > pd.Timestamp(today):
+            metrics.count("gate_scans", result="not_yet")
+            return False, f"This pass is only valid from {row['start_date']:%Y-%m-%d}.", row
+        metrics.count("gate_scans", result="valid")
+        return True, "Valid gate pass.", row
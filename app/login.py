@@ -0,0 +1,66 @@
+import streamlit as st
+
+from app import auth
+
+
+@st.cache_resource
+def get_credentials():
+    return auth.CredentialStore()
+
+
+def client_key():
+    # The browser's address, so a new tab or session doesn't start its failed logins over;
+    # Streamlit has none for localhost, where the session's own key has to do.
+    return st.context.ip_address or st.session_state.CLIENT_KEY
+
+
+def login(role):
+    st.subheader(f"{role.capitalize()} Login")
+    u_id = st.text_input("ID", key=f"{role}_id") # Shortened: user_id -> u_id
+    pwd = st.text_input("Password", type="password", key=f"{role}_password") # Shortened: password -> pwd
+    login_btn = st.button("Login", key=f"{role}_login")
+
+    if login_btn:
+        user, wait = get_credentials().verify(u_id, pwd, role, client_key=client_key())
+        if wait:
+            st.error(f"Too many failed attempts. Please try again in {wait} seconds.")
+        elif user is None:
+            st.error(f"Oops! Invalid {role.capitalize()} ID or Password. Please try again.")
+        elif role == "student":
+            st.session_state.LI_AS = "student"
+            st.success(f"Welcome, you're logged in as a student!")
+            st.rerun()
+        elif role == "teacher":
+            st.session_state.LI_AS = "teacher"
+            st.session_state.T_NAME = user["name"]
+            st.success(f"Welcome, {user['name']}! You're logged in as a teacher.")
+            st.rerun()
+        elif role == "admin":
+            st.session_state.LI_AS = "admin"
+            st.success("Welcome! You're logged in as an admin.")
+            st.rerun()
+        elif role == "gate":
+            st.session_state.LI_AS = "gate"
+            st.success("Welcome! You're logged in at the gate.")
+            st.rerun()
+
+
+def logout():
+    if st.sidebar.button("Logout"):
+        st.session_state.LI_AS = None
+        st.session_state.T_NAME = None
+        st.rerun()
+
+
+def login_page():
+    st.sidebar.title("Login to Your Portal")
+    page = st.sidebar.radio("Select Role", ["🧑‍🎓Student", "🧑‍🏫Teacher", "🛡️Admin", "🚧Gate"], key="role_selection_radio")
+
+    if page == "🧑‍🎓Student":
+        login("student")
+    elif page == "🧑‍🏫Teacher":
+        login("teacher") 
+    elif page == "🛡️Admin":
+        login("admin")
+    elif page == "🚧Gate":
+        login("gate")
@@ -0,0 +1,151 @@
+import bisect
+import collections
+import contextlib
+import cProfile
+import itertools
+import os
+import threading
+import time
+
+METRICS_FILE = os.environ.get("LEAVE_METRICS_FILE")
+PROFILE_DIR = os.environ.get("LEAVE_PROFILE_DIR")
+WRITE_INTERVAL = 15  # seconds between rewrites of METRICS_FILE
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT = 1000  # latencies kept per operation for the admin page's percentiles
+
+_profile_numbers = itertools.count()
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = collections.deque(maxlen=RECENT)
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+
+class Registry:
+    """
+    Process-wide latency histograms and counters. Everything is in memory and shared by
+    all sessions of the server process; recording is a dict lookup under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = collections.defaultdict(Histogram)
+        self._counters = collections.Counter()
+        self._collectors = []
+        self._written = 0.0
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._histograms[name].observe(seconds)
+
+    def count(self, name, n=1, **labels):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += n
+
+    def add_collector(self, collect):
+        """`collect()` returns [(name, labels, value)] for counters kept elsewhere, read at export time."""
+        self._collectors.append(collect)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def latencies(self):
+        """One dict per timed operation, percentiles over its last RECENT calls."""
+        with self._lock:
+            items = [(name, hist.count, hist.sum, sorted(hist.recent)) for name, hist in self._histograms.items()]
+        rows = []
+        for name, count, total, recent in items:
+            pick = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] * 1000
+            rows.append({"operation": name, "calls": count, "total_s": total, "mean_ms": total / count * 1000,
+                         "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": recent[-1] * 1000})
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+    def counters(self):
+        with self._lock:
+            items = [(name, labels, value) for (name, labels), value in self._counters.items()]
+        for collect in self._collectors:
+            items.extend((name, tuple(sorted(labels.items())), value) for name, labels, value in collect())
+        return sorted(items)
+
+    def prometheus_text(self):
+        lines = ["# TYPE leave_latency_seconds histogram"]
+        with self._lock:
+            hists = [(name, list(hist.buckets), hist.count, hist.sum) for name, hist in sorted(self._histograms.items())]
+        for name, buckets, count, total in hists:
+            cumulative = 0
+            for le, n in zip([*map(str, BUCKETS), "+Inf"], buckets):
+                cumulative += n
+                lines.append(f'leave_latency_seconds_bucket{{op="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'leave_latency_seconds_sum{{op="{name}"}} {total}')
+            lines.append(f'leave_latency_seconds_count{{op="{name}"}} {count}')
+        typed = set()
+        for name, labels, value in self.counters():
+            if name not in typed:
+                lines.append(f"# TYPE leave_{name}_total counter")
+                typed.add(name)
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f"leave_{name}_total{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def maybe_write(self, path=METRICS_FILE, interval=WRITE_INTERVAL):
+        """Rewrite the Prometheus text file if it's set and hasn't been written for `interval` seconds."""
+        if not path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._written < interval:
+                return
+            self._written = now
+        self.write(path)
+
+
+REGISTRY = Registry()
+count = REGISTRY.count
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Record the wall time of a block, or of every call when used as a decorator."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def profiled(label):
+    """cProfile the block into PROFILE_DIR/<label>_<time>_<pid>_<n>.prof when LEAVE_PROFILE_DIR is set."""
+    if not PROFILE_DIR:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another session's rerun is already being profiled in this process
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{label}_{stamp}_{os.getpid()}_{next(_profile_numbers)}.prof"))
@@ -0,0 +1,138 @@
+import datetime
+import functools
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import qrcode
+from PIL import Image
+
+from app import metrics
+
+CACHE_DIR = os.environ.get("GATEPASS_CACHE_DIR", "gatepass_cache")
+STUDENT_BOX_SIZE = 4
+PREVIEW_BOX_SIZE = 6
+_END_DATE = re.compile(r"\|TO:(\d{4}-\d{2}-\d{2})(?:\||$)")
+_DAY_DIR = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+_swept_on = None  # the day this process last evicted ended passes from the disk cache
+# One thread renders newly approved passes in the background; it starts with the first approval
+_prerender_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gatepass-prerender")
+
+log = logging.getLogger(__name__)
+
+
+def generate_qr_code(data: str, box_size=6) -> Image.Image:
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").convert('RGB')
+    return img
+
+def image_to_bytes(img):
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+
+def _cache_path(data, box_size):
+    """Where a pass is kept on disk: filed under the day its leave ends, or None without one."""
+    end = _END_DATE.search(data)
+    if end is None:
+        return None
+    digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, end.group(1), f"{digest}_{box_size}.png")
+
+
+def evict_ended(today=None):
+    """
+    Drop the cached passes whose leave ended before `today`: one directory per end date,
+    so this is a listing and a few deletes. Returns how many days were dropped.
+    """
+    today = (today or datetime.date.today()).isoformat()
+    try:
+        days = os.listdir(CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    # anything that isn't a day directory is from the old digest-prefix layout
+    ended = [day for day in days if not _DAY_DIR.fullmatch(day) or day < today]
+    for day in ended:
+        shutil.rmtree(os.path.join(CACHE_DIR, day), ignore_errors=True)
+    metrics.count("cache_evictions", len(ended), cache="gate_pass_disk")
+    return len(ended)
+
+
+@functools.lru_cache(maxsize=512)
+def gate_pass_png(data: str, box_size=PREVIEW_BOX_SIZE) -> bytes:
+    """
+    PNG bytes for a gate pass. `qr_code_data` never changes once a request is granted,
+    so the image is rendered once, kept on disk until its leave has ended, and served
+    from memory after that.
+    """
+    global _swept_on
+    path = _cache_path(data, box_size)
+    if path is not None:
+        try:
+            with open(path, "rb") as fh:
+                metrics.count("cache_requests", cache="gate_pass_disk", result="hit")
+                return fh.read()
+        except FileNotFoundError:
+            metrics.count("cache_requests", cache="gate_pass_disk", result="miss")
+    with metrics.timed("qr.render"):
+        png = image_to_bytes(generate_qr_code(data, box_size=box_size))
+    if path is None:
+        return png
+    today = datetime.date.today()
+    if _swept_on != today:  # the cache only grows here, so this is where it's swept, once a day
+        _swept_on = today
+        evict_ended(today)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # the prerender thread may race a page
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as fh:
+            fh.write(png)
+        os.replace(tmp_path, path)
+    except FileNotFoundError:
+        pass  # another process evicted this (already ended) day meanwhile; the PNG is still good
+    return png
+
+
+def _memory_cache_counts():
+    info = gate_pass_png.cache_info()
+    return [("cache_requests", {"cache": "gate_pass_memory", "result": "hit"}, info.hits),
+            ("cache_requests", {"cache": "gate_pass_memory", "result": "miss"}, info.misses)]
+
+
+metrics.REGISTRY.add_collector(_memory_cache_counts)
+
+
+def _prerender(payloads):
+    for data in payloads:
+        for box_size in (STUDENT_BOX_SIZE, PREVIEW_BOX_SIZE):
+            gate_pass_png(data, box_size)
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        log.error("Couldn't pre-render gate passes", exc_info=future.exception())
+
+
+def prerender_gate_passes(payloads):
+    """
+    Render every size the app serves for newly granted passes, on a background thread:
+    at ~30 ms a render, a bulk approval of hundreds would otherwise hold up the click for
+    seconds. A pass viewed before its turn comes is just rendered then, like any miss.
+    """
+    future = _prerender_pool.submit(_prerender, list(payloads))
+    future.add_done_callback(_log_failure)
+    return future
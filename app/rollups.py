@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from app import metrics, storage
+
+ROLLUP_DATABASE = os.environ.get("LEAVE_ROLLUP_PATH", "leave_rollups.db")
+LOW_ATTENDANCE = 80.0  # applicants below this are listed for the wardens
+DIMENSIONS = ["all", "branch", "batch", "teacher", "day"]
+TRACKED_COLUMNS = ["req_id", "branch", "batch", "teacher", "day", "status", "submitted_at", "decided_at"]
+
+
+def _tracked_frame(df):
+    """What the rollups remember about each request: its dimension values and status."""
+    df = df.reset_index(drop=True)
+    out = pd.DataFrame({col: df[col].astype(object) for col in ["req_id", "branch", "batch", "teacher", "status"]})
+    submitted = pd.to_datetime(df["submitted_at"], errors="coerce")
+    started = pd.to_datetime(df["start_date"], errors="coerce")
+    # requests from before submitted_at was recorded are counted on their leave's first day
+    out["day"] = submitted.fillna(started).dt.strftime("%Y-%m-%d").astype(object)
+    out["all"] = "all"
+    out["submitted_at"] = submitted.dt.strftime("%Y-%m-%dT%H:%M:%S").astype(object)
+    out["decided_at"] = pd.to_datetime(df["decided_at"], errors="coerce").dt.strftime("%Y-%m-%dT%H:%M:%S").astype(object)
+    out["attendance"] = pd.to_numeric(df["attendance"], errors="coerce").astype("float64").round(1)  # as entered
+    out["student_id"], out["student_name"] = df["student_id"].astype(object), df["student_name"].astype(object)
+    return out.where(out.notna(), None)
+
+
+def _iso(value):
+    try:
+        stamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(stamp) else stamp.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _tracked_row(row):
+    """`_tracked_frame` for one row dict, without the cost of building a frame on every submit."""
+    out = {col: None if row.get(col) is None else str(row[col])
+           for col in ["req_id", "branch", "batch", "teacher", "status", "student_id", "student_name"]}
+    out["submitted_at"], out["decided_at"] = _iso(row.get("submitted_at")), _iso(row.get("decided_at"))
+    day = out["submitted_at"] or _iso(row.get("start_date"))
+    out["day"], out["all"] = day and day[:10], "all"
+    try:
+        out["attendance"] = round(float(row.get("attendance")), 1)
+    except (TypeError, ValueError):
+        out["attendance"] = None
+    if out["attendance"] != out["attendance"]:  # NaN
+        out["attendance"] = None
+    return out
+
+
+class Rollups:
+    """
+    Pre-aggregated counts for the admin analytics page, in their own SQLite file.
+    The store passes every submit and decision on as it commits it, so the page reads
+    a few hundred aggregate rows however many years of requests there are:
+
+    - `status_counts`: requests per (dimension, value, status), the dimensions being
+      branch, batch, teacher (mentor), day submitted, and "all"
+    - `latency`: per mentor, requests decided and the total and longest time from
+      submission to the first decision
+    - `low_attendance`: applicants who applied with attendance below LOW_ATTENDANCE
+    - `tracked`: each request's dimension values and current status, so a decision
+      knows which counts to move without asking the store
+
+    Anything that writes the requests behind the store's back can be caught up with
+    `python -m app.rollups rebuild`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tracked (
+            req_id TEXT PRIMARY KEY,
+            branch TEXT, batch TEXT, teacher TEXT, day TEXT, status TEXT,
+            submitted_at TEXT, decided_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS status_counts (
+            dimension TEXT NOT NULL, value TEXT NOT NULL, status TEXT NOT NULL, n INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value, status)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS latency (
+            teacher TEXT PRIMARY KEY,
+            decided INTEGER NOT NULL, total_seconds REAL NOT NULL, max_seconds REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS low_attendance (
+            student_id TEXT PRIMARY KEY,
+            student_name TEXT, branch TEXT, batch TEXT, teacher TEXT,
+            requests INTEGER NOT NULL, lowest REAL NOT NULL, latest REAL NOT NULL, last_submitted TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    BUMP = """
+        INSERT INTO status_counts (dimension, value, status, n) VALUES (?, ?, ?, ?)
+        ON CONFLICT (dimension, value, status) DO UPDATE SET n = n + excluded.n
+    """
+    ADD_LATENCY = """
+        INSERT INTO latency (teacher, decided, total_seconds, max_seconds) VALUES (?, ?, ?, ?)
+        ON CONFLICT (teacher) DO UPDATE SET decided = decided + excluded.decided,
+            total_seconds = total_seconds + excluded.total_seconds,
+            max_seconds = MAX(max_seconds, excluded.max_seconds)
+    """
+    ADD_LOW_ATTENDANCE = """
+        INSERT INTO low_attendance VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (student_id) DO UPDATE SET student_name = excluded.student_name,
+            branch = excluded.branch, batch = excluded.batch, teacher = excluded.teacher,
+            requests = requests + excluded.requests, lowest = MIN(lowest, excluded.lowest),
+            latest = excluded.latest, last_submitted = excluded.last_submitted
+    """
+
+    def __init__(self, path=ROLLUP_DATABASE):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_built(self):
+        return self._conn().execute("SELECT 1 FROM meta WHERE key = 'built_at'").fetchone() is not None
+
+    def built_at(self):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        return row[0] if row else None
+
+    # Writes: called by the store after each commit.
+
+    @staticmethod
+    def _bump(conn, tracked, statuses, delta):
+        conn.executemany(Rollups.BUMP, [
+            (dim, row[dim], status, delta)
+            for row, status in zip(tracked, statuses) for dim in DIMENSIONS if row[dim] is not None
+        ])
+
+    @metrics.timed("rollups.submitted")
+    def submitted(self, rows):
+        """New requests, as the row dicts the store just wrote."""
+        conn = self._conn()
+        with conn:
+            fresh = []
+            for row in map(_tracked_row, rows):
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO tracked VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row[col] for col in TRACKED_COLUMNS],
+                )
+                if cur.rowcount:  # a rebuild may already have picked it up
+                    fresh.append(row)
+            self._bump(conn, fresh, [row["status"] for row in fresh], 1)
+            conn.executemany(self.ADD_LOW_ATTENDANCE, [
+                (row["student_id"], row["student_name"], row["branch"], row["batch"], row["teacher"],
+                 1, row["attendance"], row["attendance"], row["submitted_at"])
+                for row in fresh if row["attendance"] is not None and row["attendance"] < LOW_ATTENDANCE
+            ])
+
+    @metrics.timed("rollups.decided")
+    def decided(self, updates):
+        """Status changes, as (req_id, status, decided_at) with decided_at an ISO timestamp."""
+        conn = self._conn()
+        with conn:
+            for req_id, status, decided_at in updates:
+                row = conn.execute(
+                    f"SELECT {', '.join(TRACKED_COLUMNS)} FROM tracked WHERE req_id = ?", (req_id,)
+                ).fetchone()
+                if row is None:
+                    continue  # written before the rollups existed and not rebuilt since
+                row = dict(zip(TRACKED_COLUMNS, row), all="all")
+                if row["status"] == status:
+                    continue
+                self._bump(conn, [row], [row["status"]], -1)
+                self._bump(conn, [row], [status], 1)
+                first_decision = row["decided_at"] is None and status in storage.DECIDED_STATUSES
+                if first_decision and row["submitted_at"] and decided_at:
+                    seconds = (pd.Timestamp(decided_at) - pd.Timestamp(row["submitted_at"])).total_seconds()
+                    conn.execute(self.ADD_LATENCY, (row["teacher"], 1, seconds, seconds))
+                conn.execute(
+                    "UPDATE tracked SET status = ?, decided_at = COALESCE(decided_at, ?) WHERE req_id = ?",
+                    (status, decided_at if first_decision else None, req_id),
+                )
+
+    @metrics.timed("rollups.rebuild")
+    def rebuild(self, df):
+        """Start over from every request there is (`store.load_all()`). The one place that groups."""
+        tracked = _tracked_frame(df)
+        counts = pd.concat([
+            tracked.groupby([dim, "status"], observed=True).size().rename("n").reset_index()
+            .rename(columns={dim: "value"}).assign(dimension=dim)
+            for dim in DIMENSIONS
+        ])
+        decided = tracked.loc[tracked["decided_at"].notna() & tracked["submitted_at"].notna()
+                              & tracked["status"].isin(storage.DECIDED_STATUSES)]
+        waits = (pd.to_datetime(decided["decided_at"]) - pd.to_datetime(decided["submitted_at"])).dt.total_seconds()
+        latency = waits.groupby(decided["teacher"]).agg(["size", "sum", "max"]).reset_index()
+        low = tracked.loc[tracked["attendance"].astype(float) < LOW_ATTENDANCE]
+        low = low.assign(order=low["submitted_at"].fillna("")).sort_values("order", kind="stable")
+        students = low.groupby("student_id", sort=False).agg(
+            student_name=("student_name", "last"), branch=("branch", "last"), batch=("batch", "last"),
+            teacher=("teacher", "last"), requests=("req_id", "size"), lowest=("attendance", "min"),
+            latest=("attendance", "last"), last_submitted=("submitted_at", "last"),
+        ).reset_index()
+
+        conn = self._conn()
+        with conn:
+            for table in ("tracked", "status_counts", "latency", "low_attendance", "meta"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany("INSERT INTO tracked VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             tracked[TRACKED_COLUMNS].values.tolist())
+            conn.executemany("INSERT INTO status_counts VALUES (?, ?, ?, ?)",
+                             counts[["dimension", "value", "status", "n"]].astype(object).values.tolist())
+            conn.executemany("INSERT INTO latency VALUES (?, ?, ?, ?)", latency.astype(object).values.tolist())
+            conn.executemany("INSERT INTO low_attendance VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             students.astype(object).where(students.notna(), None).values.tolist())
+            conn.execute("INSERT INTO meta VALUES ('built_at', ?)", (storage.timestamp(),))
+        return len(tracked)
+
+    # Reads for the analytics page.
+
+    def _read(self, sql, params=(), columns=None):
+        with metrics.timed("rollups.query"):
+            rows = self._conn().execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def totals(self):
+        """{status: number of requests}, every status included."""
+        df = self._read("SELECT status, n FROM status_counts WHERE dimension = 'all'", columns=["status", "n"])
+        return {status: 0 for status in storage.LEAVE_STATUSES} | dict(zip(df["status"], df["n"]))
+
+    def counts(self, dimension, start=None, end=None):
+        """Requests per value of one dimension, one column per status plus a total."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown rollup dimension: {dimension}")
+        sql, params = "SELECT value, status, n FROM status_counts WHERE dimension = ? AND n != 0", [dimension]
+        if start is not None:
+            sql, params = sql + " AND value >= ?", params + [start.isoformat()]
+        if end is not None:
+            sql, params = sql + " AND value <= ?", params + [end.isoformat()]
+        df = self._read(sql, params, columns=[dimension, "status", "n"])
+        table = df.pivot_table(index=dimension, columns="status", values="n", aggfunc="sum", fill_value=0)
+        statuses = storage.LEAVE_STATUSES + sorted(set(table.columns) - set(storage.LEAVE_STATUSES))
+        table = table.reindex(columns=statuses, fill_value=0)
+        table.columns.name = None
+        return table.assign(Total=table.sum(axis=1))
+
+    def latency(self):
+        """Per mentor: requests decided and the mean and longest wait for a decision, in hours."""
+        df = self._read("SELECT teacher, decided, total_seconds, max_seconds FROM latency ORDER BY teacher",
+                        columns=["teacher", "decided", "total_seconds", "max_seconds"])
+        df = df.astype({"decided": "int64", "total_seconds": "float64", "max_seconds": "float64"})
+        return pd.DataFrame({
+            "teacher": df["teacher"],
+            "decided": df["decided"],
+            "mean_hours": (df["total_seconds"] / df["decided"] / 3600).round(1),
+            "max_hours": (df["max_seconds"] / 3600).round(1),
+        })
+
+    def low_attendance(self):
+        columns = ["student_id", "student_name", "branch", "batch", "teacher", "requests", "lowest", "latest",
+                   "last_submitted"]
+        return self._read(f"SELECT {', '.join(columns)} FROM low_attendance ORDER BY lowest, student_id",
+                          columns=columns)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Leave analytics rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--path", default=storage.DATABASE)
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=None)
+    args = parser.parse_args()
+
+    store = storage.open_store(args.backend, args.path)
+    print(f"Rebuilt {store.rollups.path} from {store.rollups.rebuild(store.load_all())} leave requests")
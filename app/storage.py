@@ -0,0 +1,921 @@
+import bisect
+import contextlib
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from app import dedupe, metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single writer assumed
+    fcntl = None
+
+
+DATABASE = "leave_request.csv"
+SQLITE_DATABASE = "leave_request.db"
+LEAVE_STATUS_PENDING = "Pending"
+LEAVE_STATUS_GRANTED = "Granted"
+LEAVE_STATUS_REJECTED = "Rejected"
+LEAVE_STATUS_REVOKED = "Revoked"  # granted, then withdrawn before or during the leave
+LEAVE_STATUSES = [LEAVE_STATUS_PENDING, LEAVE_STATUS_GRANTED, LEAVE_STATUS_REJECTED, LEAVE_STATUS_REVOKED]
+
+COLUMNS = [
+    "student_name", "attendance", "year", "student_id", "branch", "batch", "email",
+    "leave_days", "start_date", "end_date", "reason", "teacher", "status", "qr_code_data",
+    "req_id", "submitted_at", "decided_at",
+]
+TEXT_COLUMNS = [col for col in COLUMNS if col not in ("attendance", "leave_days")]
+DATE_COLUMNS = ["start_date", "end_date"]
+CATEGORY_COLUMNS = ["year", "branch", "batch", "teacher", "status"]
+# Worked out once per load for the duplicate check; never written back to disk
+DERIVED_COLUMNS = ["reason_key"]
+DECIDED_STATUSES = [LEAVE_STATUS_GRANTED, LEAVE_STATUS_REJECTED, LEAVE_STATUS_REVOKED]
+# Views that can include archived requests; pending requests are never archived
+ARCHIVED_VIEWS = {"student", "teacher_history"}
+ARCHIVE_AFTER_DAYS = 30  # decided requests stay live this long after their leave ends
+
+log = logging.getLogger(__name__)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:12]
+
+
+def timestamp():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def coerce_frame(df):
+    """
+    Fill in missing columns and type everything once per load: datetime64 dates,
+    categoricals for the low-cardinality columns and nullable numbers, so pages can
+    filter and sort without re-parsing anything.
+    """
+    for col in COLUMNS:
+        if col not in df.columns:
+            df.insert(loc=df.shape[-1], column=col, value=None)
+    df["attendance"] = pd.to_numeric(df["attendance"], errors="coerce").fillna(0.0).astype("float32")
+    df["leave_days"] = pd.to_numeric(df["leave_days"], errors="coerce").round().astype("Int16")
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors="coerce", format="ISO8601")
+    for col in TEXT_COLUMNS:
+        if col in DATE_COLUMNS:
+            continue
+        try:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+        except Exception as e:
+            log.warning("Couldn't fully convert column %r to str: %s", col, e)
+    df["qr_code_data"] = df["qr_code_data"].replace(["None", "nan"], [None, None])
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+    missing = [status for status in LEAVE_STATUSES if status not in df["status"].cat.categories]
+    df["status"] = df["status"].cat.add_categories(missing)
+    df["reason_key"] = dedupe.reason_keys(df["reason"])
+    return df
+
+
+def frame_from_rows(rows):
+    """
+    The frame coerce_frame would make of `rows`, tuples in COLUMNS order as SQLite
+    returns them, built one typed column at a time. coerce_frame's in-place conversions
+    cost ~7 ms even for no rows, which would be most of a one-row indexed lookup; SQLite
+    already hands back TEXT columns as str or None, so they only need wrapping.
+    """
+    values = dict(zip(COLUMNS, zip(*rows))) if rows else dict.fromkeys(COLUMNS, ())
+    data = {}
+    for col in COLUMNS:
+        vals = values[col]
+        if col == "attendance":
+            data[col] = pd.to_numeric(pd.Series(vals, dtype=object), errors="coerce").fillna(0.0).astype("float32")
+        elif col == "leave_days":
+            data[col] = pd.to_numeric(pd.Series(vals, dtype=object), errors="coerce").round().astype("Int16")
+        elif col in DATE_COLUMNS:
+            data[col] = pd.to_datetime(pd.Series(vals, dtype=object), errors="coerce", format="ISO8601")
+        elif col in CATEGORY_COLUMNS:
+            data[col] = pd.Categorical(vals)
+        elif col == "qr_code_data":
+            data[col] = pd.Series([None if v in ("None", "nan") else v for v in vals], dtype=object)
+        else:
+            data[col] = pd.Series(vals, dtype=object)
+    status = data["status"]
+    data["status"] = status.add_categories([s for s in LEAVE_STATUSES if s not in status.categories])
+    data["reason_key"] = pd.Series([("" if r is None else str(r)).strip().lower() for r in values["reason"]],
+                                   dtype=object)
+    return pd.DataFrame(data)
+
+
+def concat_frames(old, new):
+    """pd.concat that keeps the categorical columns categorical."""
+    fixed_old, fixed_new = {}, {}
+    for col in CATEGORY_COLUMNS:
+        cats = old[col].cat.categories.union(new[col].cat.categories)
+        fixed_old[col] = old[col].cat.set_categories(cats)
+        fixed_new[col] = new[col].cat.set_categories(cats)
+    return pd.concat([old.assign(**fixed_old), new.assign(**fixed_new)])
+
+
+def set_cell(df, label, col, value):
+    if isinstance(df[col].dtype, pd.CategoricalDtype) and value is not None and value not in df[col].cat.categories:
+        df[col] = df[col].cat.add_categories([value])
+    df.at[label, col] = value
+
+
+def index_by_id(df):
+    df = df.set_index("req_id", drop=False)
+    df.index.name = None
+    return df
+
+
+def slice_sorted(df, rows, offset, limit, sort_by=None, ascending=True):
+    """Sort the row positions `rows` of `df` by one column and take one page of them."""
+    if sort_by:
+        if sort_by not in COLUMNS:
+            raise ValueError(f"Can't sort by {sort_by!r}")
+        keys = df[sort_by].iloc[rows].reset_index(drop=True)
+        rows = rows[keys.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()]
+    elif not ascending:
+        rows = rows[::-1]
+    return df.take(rows[offset:offset + limit]), len(rows)
+
+
+def archivable(df, before):
+    """Mask of decided requests whose leave ended before `before`."""
+    return df["status"].isin(DECIDED_STATUSES) & (df["end_date"] < pd.Timestamp(before))
+
+
+def merge_archived(live, archived):
+    """
+    Live rows plus archived ones, indexed by req_id; a row in both (an interrupted archive
+    run) counts once, live. SQLite frames come with a RangeIndex, so both sides are
+    re-indexed: a mix of ints and ids is one index Arrow can't serialise for st.dataframe.
+    """
+    if archived is None or archived.empty:
+        return live
+    archived = index_by_id(archived)
+    return concat_frames(index_by_id(live), archived.loc[~archived.index.isin(live["req_id"])])
+
+
+def to_records(df):
+    """Rows as plain Python values (ISO date strings, None for missing) for sqlite3."""
+    out = df[COLUMNS].copy()
+    for col in DATE_COLUMNS:
+        out[col] = out[col].dt.strftime("%Y-%m-%d")
+    out = out.astype(object)
+    return out.where(out.notna(), None).values.tolist()
+
+
+class LeaveStore:
+    """Common interface for the places leave requests can live."""
+
+    archive = None  # app.archive.Archive holding decided requests moved out of the live store
+    rollups = None  # app.rollups.Rollups told about every submit and decision
+
+    def load(self) -> pd.DataFrame:
+        """The live requests: everything not yet archived."""
+        raise NotImplementedError
+
+    def load_all(self):
+        """Live and archived requests together, for whole-history scans."""
+        return merge_archived(self.load(), self.archive.read() if self.archive else None)
+
+    def append(self, row: dict) -> str:
+        raise NotImplementedError
+
+    def set_status(self, req_id, status, qr_code_data=None):
+        self.set_statuses([(req_id, status, qr_code_data)])
+
+    def set_statuses(self, updates):
+        """Apply many (req_id, status, qr_code_data) decisions as one write."""
+        raise NotImplementedError
+
+    # Change feed: every write gets the next sequence number.
+
+    def version(self) -> int:
+        raise NotImplementedError
+
+    def changes_since(self, version):
+        """
+        Returns (current_version, rows) where `rows` is the current state of every
+        request written after `version`, or None if the store no longer remembers
+        that far back (the caller should reload instead).
+        """
+        raise NotImplementedError
+
+    def archive_decided(self, before):
+        """Move decided requests that ended before `before` into the archive. Returns how many."""
+        raise NotImplementedError
+
+    def _roll_up(self, event, *args):
+        # The write has already committed and the rollups can be rebuilt from it, so a
+        # failure here is logged rather than reported to the user as a failed save.
+        if self.rollups is None:
+            return
+        try:
+            getattr(self.rollups, event)(*args)
+        except Exception:
+            log.exception("Couldn't update the analytics rollups; run `python -m app.rollups rebuild`")
+
+    def _archived(self, view, key):
+        if self.archive is None or view not in ARCHIVED_VIEWS:
+            return None
+        return self.archive.view(view, key)
+
+    # Page queries. The defaults filter the full frame; indexed backends override them.
+
+    @staticmethod
+    def _view_mask(df, view, key):
+        metrics.count("rows_scanned", len(df), view=view)
+        if view == "student":
+            return df["student_id"] == key
+        if view == "student_pending":
+            return (df["student_id"] == key) & (df["status"] == LEAVE_STATUS_PENDING)
+        if view == "teacher_pending":
+            return (df["status"] == LEAVE_STATUS_PENDING) & (df["teacher"] == key)
+        if view == "teacher_history":
+            return (df["teacher"] == key) & df["status"].isin(DECIDED_STATUSES)
+        if view == "valid_passes":  # key: today's date
+            return (df["status"] == LEAVE_STATUS_GRANTED) & (df["end_date"] >= pd.Timestamp(key))
+        raise ValueError(f"Unknown view: {view}")
+
+    def _live_frames(self):
+        """The live requests as one or more frames that together make up `load()`."""
+        return [self.load()]
+
+    @staticmethod
+    def _live_rows(frames, mask):
+        """The rows of `frames` where `mask(frame)` holds, as one frame."""
+        parts = [df.loc[mask(df)] for df in frames]
+        out = parts[0]
+        for part in parts[1:]:
+            if not part.empty:
+                out = concat_frames(out, part)
+        return out
+
+    def view(self, view, key):
+        """Every row of one named view (see `_view_mask`), archived ones included."""
+        live = self._live_rows(self._live_frames(), lambda df: self._view_mask(df, view, key))
+        return merge_archived(live, self._archived(view, key))
+
+    def pending_requests(self, student_id):
+        return self.view("student_pending", student_id)
+
+    def teacher_pending(self, teacher):
+        return self.view("teacher_pending", teacher)
+
+    def teacher_history(self, teacher):
+        return self.view("teacher_history", teacher)
+
+    def page(self, view, key, offset=0, limit=25, sort_by=None, ascending=True):
+        """Return one sorted slice of a view and the view's total row count."""
+        frames = self._live_frames()
+        archived = self._archived(view, key)
+        if len(frames) == 1 and (archived is None or archived.empty):
+            # sort and slice row positions; only the page itself gets copied
+            df = frames[0]
+            return slice_sorted(df, np.flatnonzero(self._view_mask(df, view, key).to_numpy()),
+                                offset, limit, sort_by, ascending)
+        df = merge_archived(self._live_rows(frames, lambda df: self._view_mask(df, view, key)), archived)
+        return slice_sorted(df, np.arange(len(df)), offset, limit, sort_by, ascending)
+
+    def overlapping_pending(self, student_id, start, end, reason):
+        """The student's pending requests that overlap [start, end] with the same reason."""
+        return dedupe.find_overlaps(self.pending_requests(student_id), start, end, reason)
+
+    def granted_between(self, start, end, teacher=None):
+        """Granted requests whose leave overlaps [start, end], optionally for one mentor."""
+        def hit(df):
+            mask = (
+                (df["status"] == LEAVE_STATUS_GRANTED)
+                & (df["start_date"] <= pd.Timestamp(end))
+                & (df["end_date"] >= pd.Timestamp(start))
+            )
+            return mask & (df["teacher"] == teacher) if teacher else mask
+
+        return self._with_archived_grants(self._live_rows(self._live_frames(), hit), start, end, teacher)
+
+    def _with_archived_grants(self, live, start, end, teacher):
+        if self.archive is None:
+            return live
+        archived = self.archive.granted_between(start, end, teacher)
+        if archived.empty:
+            return live
+        return merge_archived(live, archived).sort_values("start_date", kind="stable")
+
+    def active_pass(self, student_id, today):
+        """The student's granted request that ends soonest on or after `today` (0 or 1 rows)."""
+        # archived requests have all ended
+        df = self._live_rows(self._live_frames(), lambda df: self._view_mask(df, "student", student_id))
+        df = df.loc[(df["status"] == LEAVE_STATUS_GRANTED) & (df["end_date"] >= pd.Timestamp(today))]
+        return df.sort_values("end_date", kind="stable").head(1)
+
+    def teacher_passes(self, teacher, today):
+        """The mentor's granted requests that haven't ended by `today`, soonest-ending first."""
+        # archived requests have all ended
+        def hit(df):
+            return self._view_mask(df, "valid_passes", today.isoformat()) & (df["teacher"] == teacher)
+
+        return self._live_rows(self._live_frames(), hit).sort_values("end_date", kind="stable")
+
+
+class JournalStore(LeaveStore):
+    """
+    Append-only store: `leave_request.csv` is the last compacted snapshot and every
+    change since then is one fsync'd JSON line in `leave_request.csv.journal`
+    (an inserted row, or the fields an approve/reject changed on one row).
+    The journal is folded back into the snapshot once it grows past `compact_bytes` and
+    COMPACT_RATIO of the snapshot's size, so the rewrites stay in proportion to what's
+    written however big the snapshot gets; the write that crosses that line hands the
+    compaction to a background thread rather than doing it while the user waits.
+
+    The loaded requests are kept in memory and brought up to date by replaying only the
+    journal lines written since the last load, so a write never forces a full reload.
+    Rows inserted since then go into a small tail frame rather than being copied into
+    the main one, which only happens once the tail reaches TAIL_ROWS or at compaction;
+    page queries filter the two separately. Each journal line carries the next
+    change-feed sequence number; a compaction starts the new journal with a "base"
+    line recording where the numbering got to. Writers take the next number from the
+    journal's last line, so a write never replays anything.
+    """
+
+    TAIL_ROWS = 2000
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, path=DATABASE, compact_bytes=256 * 1024, archive=None, rollups=None):
+        self.path = path
+        self.archive = archive
+        self.rollups = rollups
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_bytes = compact_bytes
+        self._base = None  # snapshot rows and everything folded in since
+        self._tail = None  # rows inserted since the last fold
+        self._merged = None  # load()'s frame, built when asked for
+        self._snapshot_sig = None
+        self._offset = 0
+        self._version = 0
+        self._base_version = 0
+        self._log_versions = []  # (version, req_id) of each change replayed since the base
+        self._log_ids = []
+        self._cache_lock = threading.Lock()
+        self._compacting = threading.Lock()  # held by this process's background compaction
+        self.migrate()
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive=True):
+        # flock on a side file so readers/writers in other sessions and processes queue up
+        with open(self.lock_path, "a") as lock_fh:
+            if fcntl:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=COLUMNS)
+        try:
+            return pd.read_csv(self.path, dtype={col: str for col in TEXT_COLUMNS})
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=COLUMNS)
+
+    def _read_journal(self, offset=0):
+        """Return the complete journal records after `offset` and the offset just past them."""
+        records = []
+        if not os.path.exists(self.journal_path):
+            return records, 0
+        with open(self.journal_path, "rb") as fh:
+            fh.seek(offset)
+            data = fh.read()
+        end = data.rfind(b"\n") + 1  # a half-written last line is picked up next time
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # torn line from a writer that died mid-append
+        return records, offset + end
+
+    def _write_snapshot(self, df):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as fh:
+            df.to_csv(fh, index=False)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _write_journal(self, records):
+        payload = "".join(json.dumps(rec, default=str) + "\n" for rec in records).encode("utf-8")
+        with open(self.journal_path, "ab") as fh:
+            if fh.tell() and not self._ends_with_newline():
+                payload = b"\n" + payload  # don't glue onto a torn line
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+            return fh.tell()
+
+    def _ends_with_newline(self):
+        with open(self.journal_path, "rb") as fh:
+            fh.seek(-1, os.SEEK_END)
+            return fh.read(1) == b"\n"
+
+    def _snapshot_signature(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def _replay(self, records):
+        """Apply journal records to the base and tail frames; caller holds the cache lock."""
+        inserted = []
+
+        def flush():
+            if not inserted:
+                return
+            new = index_by_id(coerce_frame(pd.DataFrame(inserted)))
+            inserted.clear()
+            new = new.loc[~new.index.duplicated(keep="last")]
+            # rows can already be in the snapshot if a compaction died before truncating
+            stale = [req_id for req_id in new.index if req_id in self._base.index]
+            if stale:
+                self._base = self._base.drop(index=stale)
+            self._tail = concat_frames(self._tail.drop(index=new.index, errors="ignore"), new)
+
+        for rec in records:
+            op = rec.get("op")
+            if op == "base":
+                self._version = self._base_version = rec["seq"]
+                continue
+            # lines from before the change feed have no seq; number them in journal order
+            self._version = rec.get("seq", self._version + 1)
+            if op == "archive":
+                flush()
+                self._base = self._base.drop(index=rec["req_ids"], errors="ignore")
+                self._tail = self._tail.drop(index=rec["req_ids"], errors="ignore")
+                self._log_ids.extend(rec["req_ids"])
+                self._log_versions.extend([self._version] * len(rec["req_ids"]))
+                continue
+            if op == "update":
+                flush()
+                req_id = rec["req_id"]
+                frame = self._tail if req_id in self._tail.index else self._base if req_id in self._base.index else None
+                if frame is not None:
+                    for col, value in rec["fields"].items():
+                        if col == "decided_at" and pd.notna(frame.at[req_id, col]):
+                            continue  # a revoke or re-decision keeps the first decision's time
+                        set_cell(frame, req_id, col, value)
+                self._log_ids.append(req_id)
+            else:
+                row = rec.get("row", rec)  # bare rows are pre-"op" journal lines
+                inserted.append(row)
+                self._log_ids.append(row.get("req_id"))
+            self._log_versions.append(self._version)
+        flush()
+        if records:
+            self._merged = None
+        if len(self._tail) >= self.TAIL_ROWS:
+            self._fold()
+
+    def _fold(self):
+        self._base = self._frame()
+        self._tail = self._base.iloc[:0].copy()
+        self._merged = None
+
+    def _frame(self):
+        """Base and tail as one frame, built once per change; caller holds the cache lock."""
+        if self._merged is None:
+            self._merged = self._base if self._tail.empty else concat_frames(self._base, self._tail)
+        return self._merged
+
+    def _refresh(self):
+        """Bring the cached frames up to date; caller holds at least a shared lock."""
+        sig = self._snapshot_signature()
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        if self._base is None or sig != self._snapshot_sig or journal_size < self._offset:
+            metrics.count("cache_requests", cache="journal_frame", result="reload")
+            with metrics.timed("store.reload"):
+                self._base = index_by_id(coerce_frame(self._read_snapshot()))
+                self._tail = self._base.iloc[:0].copy()
+                self._merged = None
+                self._version = self._base_version = 0
+                self._log_versions, self._log_ids = [], []
+                records, self._offset = self._read_journal()
+                self._replay(records)
+            self._snapshot_sig = sig
+        elif journal_size > self._offset:
+            metrics.count("cache_requests", cache="journal_frame", result="tail")
+            records, self._offset = self._read_journal(self._offset)
+            self._replay(records)
+        else:
+            metrics.count("cache_requests", cache="journal_frame", result="hit")
+
+    def _last_seq(self):
+        """
+        The sequence number on the journal's last complete line, read backwards from the
+        end of the file; None if that line predates sequence numbers.
+        """
+        if not os.path.exists(self.journal_path):
+            return 0
+        with open(self.journal_path, "rb") as fh:
+            end = fh.seek(0, os.SEEK_END)
+            chunk = 4096
+            while True:
+                start = max(0, end - chunk)
+                fh.seek(start)
+                data = fh.read(end - start)
+                lines = data[:data.rfind(b"\n") + 1].splitlines()  # a torn last line doesn't count
+                if start > 0:
+                    lines = lines[1:]  # probably cut off at the front
+                for line in reversed(lines):
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    return rec.get("seq")
+                if start == 0:
+                    return 0
+                chunk *= 4
+
+    def migrate(self):
+        """Give a legacy leave_request.csv request ids so it can act as the journal snapshot."""
+        if not os.path.exists(self.path):
+            return False
+        with self._locked():
+            try:
+                header = pd.read_csv(self.path, nrows=0).columns
+            except pd.errors.EmptyDataError:
+                return False
+            if "req_id" in header:
+                return False
+            df = pd.read_csv(self.path, dtype=str)
+            df["req_id"] = [new_request_id() for _ in range(len(df))]
+            self._write_snapshot(df)
+        return True
+
+    @metrics.timed("store.load")
+    def load(self):
+        # Shared frame; callers filter it and must not modify it in place.
+        with self._locked(exclusive=False), self._cache_lock:
+            self._refresh()
+            return self._frame()
+
+    def _live_frames(self):
+        with self._locked(exclusive=False), self._cache_lock:
+            self._refresh()
+            return [self._base] if self._tail.empty else [self._base, self._tail]
+
+    def version(self):
+        with self._locked(exclusive=False), self._cache_lock:
+            self._refresh()
+            return self._version
+
+    def changes_since(self, version):
+        with self._locked(exclusive=False), self._cache_lock:
+            self._refresh()
+            if version < self._base_version:
+                return self._version, None
+            start = bisect.bisect_right(self._log_versions, version)
+            ids = list(dict.fromkeys(self._log_ids[start:]))
+            base = self._base.loc[[req_id for req_id in ids if req_id in self._base.index]]
+            tail = self._tail.loc[[req_id for req_id in ids if req_id in self._tail.index]]
+            return self._version, base if tail.empty else concat_frames(base, tail)
+
+    def append(self, row):
+        row = dict(row)
+        row.setdefault("req_id", new_request_id())
+        row.setdefault("submitted_at", timestamp())
+        self._commit([{"op": "insert", "row": row}])
+        self._roll_up("submitted", [row])
+        return row["req_id"]
+
+    def set_statuses(self, updates):
+        updates, now = list(updates), timestamp()
+        self._commit([
+            {"op": "update", "req_id": req_id,
+             "fields": {"status": status, "qr_code_data": qr_code_data, "decided_at": now}}
+            for req_id, status, qr_code_data in updates
+        ])
+        self._roll_up("decided", [(req_id, status, now) for req_id, status, _ in updates])
+
+    @metrics.timed("store.commit")
+    def _commit(self, records):
+        with self._locked(), self._cache_lock:
+            last = self._last_seq()  # follow the last writer's numbering without replaying its writes
+            if last is None:
+                self._refresh()  # a journal from before sequence numbers: count its lines
+                last = self._version
+            for seq, rec in enumerate(records, start=last + 1):
+                rec["seq"] = seq
+            journal_size = self._write_journal(records)
+        if self._compaction_due(journal_size) and self._compacting.acquire(blocking=False):
+            threading.Thread(target=self._compact_in_background, name="journal-compaction", daemon=True).start()
+
+    def _compaction_due(self, journal_size):
+        try:
+            snapshot_size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            snapshot_size = 0
+        return journal_size >= max(self.compact_bytes, snapshot_size * self.COMPACT_RATIO)
+
+    def _compact_in_background(self):
+        try:
+            self.compact(only_if_due=True)
+        except Exception:
+            log.exception("Journal compaction failed; the journal is intact and it will be retried")
+        finally:
+            self._compacting.release()
+
+    def archive_decided(self, before):
+        # Parquet first, then the journal line that drops the rows: a crash in between
+        # leaves them in both places, which reads resolve in favour of the live copy.
+        with self._locked(), self._cache_lock:
+            self._refresh()
+            df = self._frame()
+            done = df.loc[archivable(df, before)]
+            if done.empty:
+                return 0
+            self.archive.write(done)
+            self._write_journal([{"op": "archive", "req_ids": list(done.index), "seq": self._version + 1}])
+        self.compact()  # the point is a smaller snapshot to parse
+        return len(done)
+
+    def compact(self, only_if_due=False):
+        with self._locked(), self._cache_lock:
+            if only_if_due and not self._compaction_due(os.path.getsize(self.journal_path)):
+                return  # another process got there first
+            self._refresh()
+            self._fold()
+            self._write_snapshot(self._base.drop(columns=DERIVED_COLUMNS))
+            with open(self.journal_path, "w", encoding="utf-8") as fh:
+                fh.write(json.dumps({"op": "base", "seq": self._version}) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+                self._offset = fh.tell()
+            self._snapshot_sig = self._snapshot_signature()
+            self._base_version = self._version
+            self._log_versions, self._log_ids = [], []
+
+
+class SqliteStore(LeaveStore):
+    """
+    SQLite (WAL) store with indexes matching the page queries, so nothing loads the
+    whole table on a rerun and approve/reject is a single-row UPDATE. Every write also
+    logs the touched req_ids in `changes`, in the same transaction, for the change feed.
+    """
+
+    CHANGES_KEPT = 10000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            req_id TEXT PRIMARY KEY,
+            student_name TEXT, attendance REAL, year TEXT, student_id TEXT,
+            branch TEXT, batch TEXT, email TEXT, leave_days INTEGER,
+            start_date TEXT, end_date TEXT, reason TEXT, teacher TEXT,
+            status TEXT, qr_code_data TEXT, submitted_at TEXT, decided_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_leave_student ON leave_requests (student_id);
+        DROP INDEX IF EXISTS idx_leave_teacher_status;
+        CREATE INDEX IF NOT EXISTS idx_leave_teacher_status_end ON leave_requests (teacher, status, end_date);
+        CREATE INDEX IF NOT EXISTS idx_leave_student_status_start
+            ON leave_requests (student_id, status, start_date);
+        CREATE INDEX IF NOT EXISTS idx_leave_status_start ON leave_requests (status, start_date);
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            req_id TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path=SQLITE_DATABASE, csv_path=DATABASE, archive=None, rollups=None):
+        self.path = path
+        self.archive = archive
+        self.rollups = rollups
+        self._local = threading.local()  # Streamlit runs each session on its own thread
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        existing = {info[1] for info in conn.execute("PRAGMA table_info(leave_requests)")}
+        for col in COLUMNS:
+            if col not in existing:  # added since this database was created
+                conn.execute(f"ALTER TABLE leave_requests ADD COLUMN {col} TEXT")
+        if csv_path and (os.path.exists(csv_path) or os.path.exists(csv_path + ".journal")):
+            self.import_csv(csv_path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    VIEWS = {
+        "student": ("WHERE student_id = ?", lambda key: (key,)),
+        "student_pending": ("WHERE student_id = ? AND status = ?", lambda key: (key, LEAVE_STATUS_PENDING)),
+        "teacher_pending": ("WHERE teacher = ? AND status = ?", lambda key: (key, LEAVE_STATUS_PENDING)),
+        "teacher_history": (
+            f"WHERE teacher = ? AND status IN ({', '.join('?' * len(DECIDED_STATUSES))})",
+            lambda key: (key, *DECIDED_STATUSES),
+        ),
+        "valid_passes": ("WHERE status = ? AND end_date >= ?", lambda key: (LEAVE_STATUS_GRANTED, key)),
+    }
+
+    def _query(self, where="", params=(), order="rowid", limit=-1, offset=0):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM leave_requests {where} ORDER BY {order} LIMIT ? OFFSET ?"
+        with metrics.timed("store.query"):
+            df = frame_from_rows(self._conn().execute(sql, (*params, limit, offset)).fetchall())
+        metrics.count("rows_fetched", len(df))
+        return df
+
+    def _view(self, view, key, **kwargs):
+        if view not in self.VIEWS:
+            raise ValueError(f"Unknown view: {view}")
+        where, params = self.VIEWS[view]
+        return self._query(where, params(key), **kwargs)
+
+    def import_csv(self, csv_path):
+        """
+        One-time migration: copy an existing CSV (and its journal) into the database.
+        That it ran is recorded in `meta`, so it never runs again, even after archiving
+        has emptied the table.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # a second process starting up waits, then sees the marker
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+                return 0
+            # a database from before the marker has rows or change-feed history if it ever imported
+            used = (conn.execute("SELECT 1 FROM leave_requests LIMIT 1").fetchone()
+                    or conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'changes'").fetchone())
+            rows = [] if used else to_records(JournalStore(csv_path).load())
+            conn.executemany(
+                f"INSERT OR IGNORE INTO leave_requests ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)", (timestamp(),))
+        return len(rows)
+
+    @metrics.timed("store.load")
+    def load(self):
+        return self._query()
+
+    @metrics.timed("store.commit")
+    def append(self, row):
+        row = dict(row)
+        row.setdefault("req_id", new_request_id())
+        row.setdefault("submitted_at", timestamp())
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO leave_requests ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [row.get(col) for col in COLUMNS],
+            )
+            self._log_changes(conn, [row["req_id"]])
+        self._roll_up("submitted", [row])
+        return row["req_id"]
+
+    def _log_changes(self, conn, req_ids):
+        conn.executemany("INSERT INTO changes (req_id) VALUES (?)", [(req_id,) for req_id in req_ids])
+        (last,) = conn.execute("SELECT last_insert_rowid()").fetchone()
+        if last % 1000 < len(req_ids):  # trim now and then, not on every write
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (last - self.CHANGES_KEPT,))
+
+    def version(self):
+        row = self._conn().execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, version):
+        conn = self._conn()
+        current = self.version()
+        if current == version:
+            return current, self._query("WHERE 0")
+        (oldest,) = conn.execute("SELECT MIN(seq) FROM changes").fetchone()
+        if oldest is None or version < oldest - 1 or version > current:
+            return current, None
+        changed = self._query(
+            "WHERE req_id IN (SELECT req_id FROM changes WHERE seq > ? AND seq <= ?)", (version, current)
+        )
+        return current, changed
+
+    def view(self, view, key):
+        return merge_archived(self._view(view, key), self._archived(view, key))
+
+    def page(self, view, key, offset=0, limit=25, sort_by=None, ascending=True):
+        if sort_by and sort_by not in COLUMNS:
+            raise ValueError(f"Can't sort by {sort_by!r}")
+        archived = self._archived(view, key)
+        if archived is not None and not archived.empty:
+            # the live part of a history view is small once it's been archived; merge in memory
+            df = merge_archived(self._view(view, key), archived)
+            return slice_sorted(df, np.arange(len(df)), offset, limit, sort_by, ascending)
+        where, params = self.VIEWS[view]
+        direction = "ASC" if ascending else "DESC"
+        order = f"{sort_by} {direction}, rowid {direction}" if sort_by else f"rowid {direction}"
+        (total,) = self._conn().execute(f"SELECT COUNT(*) FROM leave_requests {where}", params(key)).fetchone()
+        return self._view(view, key, order=order, limit=limit, offset=offset), total
+
+    def overlapping_pending(self, student_id, start, end, reason):
+        # the (student_id, status, start_date) index narrows this to the overlapping rows
+        candidates = self._query(
+            "WHERE student_id = ? AND status = ? AND start_date <= ? AND end_date >= ?",
+            (student_id, LEAVE_STATUS_PENDING, end.isoformat(), start.isoformat()),
+        )
+        return dedupe.find_overlaps(candidates, start, end, reason)
+
+    def granted_between(self, start, end, teacher=None):
+        where = "WHERE status = ? AND start_date <= ? AND end_date >= ?"
+        params = (LEAVE_STATUS_GRANTED, end.isoformat(), start.isoformat())
+        if teacher:
+            where, params = where + " AND teacher = ?", params + (teacher,)
+        return self._with_archived_grants(self._query(where, params, order="start_date"), start, end, teacher)
+
+    def active_pass(self, student_id, today):
+        return self._query(
+            "WHERE student_id = ? AND status = ? AND end_date >= ?",
+            (student_id, LEAVE_STATUS_GRANTED, today.isoformat()),
+            order="end_date", limit=1,
+        )
+
+    def teacher_passes(self, teacher, today):
+        # one range of the (teacher, status, end_date) index
+        return self._query("WHERE teacher = ? AND status = ? AND end_date >= ?",
+                           (teacher, LEAVE_STATUS_GRANTED, today.isoformat()), order="end_date")
+
+    @metrics.timed("store.commit")
+    def set_statuses(self, updates):
+        updates, now = list(updates), timestamp()
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE leave_requests SET status = ?, qr_code_data = ?, decided_at = COALESCE(decided_at, ?) "
+                "WHERE req_id = ?",
+                [(status, qr_code_data, now, req_id) for req_id, status, qr_code_data in updates],
+            )
+            self._log_changes(conn, [req_id for req_id, _, _ in updates])
+        self._roll_up("decided", [(req_id, status, now) for req_id, status, _ in updates])
+
+    def archive_decided(self, before):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # no decisions land between the select and the delete
+            done = self._query(f"WHERE status IN ({', '.join('?' * len(DECIDED_STATUSES))}) AND end_date < ?",
+                               (*DECIDED_STATUSES, before.isoformat()))
+            if done.empty:
+                return 0
+            self.archive.write(done)
+            conn.executemany("DELETE FROM leave_requests WHERE req_id = ?", [(req_id,) for req_id in done["req_id"]])
+            self._log_changes(conn, list(done["req_id"]))
+        return len(done)
+
+
+def open_store(backend=None, path=DATABASE, archive_dir=None, rollup_path=None):
+    from app.archive import ARCHIVE_DIR, Archive  # pyarrow loads with the first store, not with this module
+    from app.rollups import ROLLUP_DATABASE, Rollups
+
+    archive = Archive(archive_dir or ARCHIVE_DIR)
+    rollups = Rollups(rollup_path or ROLLUP_DATABASE)
+    backend = backend or os.environ.get("LEAVE_STORE", "journal")
+    if backend == "journal":
+        store = JournalStore(path, archive=archive, rollups=rollups)
+    elif backend == "sqlite":
+        store = SqliteStore(os.environ.get("LEAVE_SQLITE_PATH", SQLITE_DATABASE), csv_path=path,
+                            archive=archive, rollups=rollups)
+    else:
+        raise ValueError(f"Unknown leave store backend: {backend}")
+    if not rollups.is_built():  # first start with rollups: count what's already there
+        rollups.rebuild(store.load_all())
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+
+    parser = argparse.ArgumentParser(description="Leave request storage maintenance")
+    parser.add_argument("command", choices=["migrate", "compact", "archive"])
+    parser.add_argument("--path", default=DATABASE)
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default=None)
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive: move decided requests whose leave ended more than this many days ago")
+    args = parser.parse_args()
+
+    store = open_store(args.backend, args.path)  # opening a store already runs its migration
+    if args.command == "compact" and isinstance(store, JournalStore):
+        store.compact()
+    if args.command == "archive":
+        moved = store.archive_decided(datetime.date.today() - datetime.timedelta(days=args.days))
+        print(f"Archived {moved} decided requests to {store.archive.path}")
+    print(f"{args.command} done: {len(store.load())} live leave requests")
@@ -0,0 +1,189 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app import metrics
+from app.common import (
+    DATE_COLUMN_CONFIG, LEAVE_STATUS_PENDING, fmt_date, get_directory, get_store, paged_view, save_leave_request,
+)
+
+
+def student_page():
+    st.title("Welcome to Nmims Leave Application🧳!")
+    st.write("---")
+
+    st.header("Leave Application Form")
+    s_name = st.text_input("Enter your full name", placeholder="Your name") 
+    s_id = st.text_input("Enter your student ID", placeholder="Your SAP ID ") 
+
+    if not s_id:
+        st.info("Please enter your **Student ID** to proceed. It's important!")
+    else:
+        st.write(f"Your Student ID is: **{s_id}**")
+
+    yr = st.text_input("Which year are you in (e.g., 1, 2, 3, 4)?") 
+    yr_valid = False 
+    if yr:
+        try:
+            yr_int = int(yr) 
+            if 1 <= yr_int <= 4:
+                yr_valid = True
+            else:
+                st.error("Please enter a valid year (like 1, 2, 3, or 4).")
+        except ValueError:
+            st.error("That doesn't look like a valid number for the year. Try again!")
+    else:
+        st.info("Please enter your academic year.")
+
+    attn = st.number_input("What's your average attendance percentage?", min_value=0.0, max_value=100.0, value=85.0, step=0.1, format="%.1f") # Shortened: attendance -> attn
+    st.write(f"Your attendance is: **{attn:.2f}%**")
+    if attn <= 80:
+        st.warning("Heads up! Your attendance is below 80%. You might need to chat with your Mentor about this.")
+
+    email = st.text_input("Your Email ID:", placeholder="youremail@example.com") 
+
+    col_a, col_b = st.columns(2)
+    auth_leave = False 
+    spec_leave = False 
+    with col_a:
+        auth_leave = st.checkbox('Authorized Leave')
+    with col_b:
+        spec_leave = st.checkbox('Special Leave')
+
+    leave_type_sel = False 
+    if auth_leave and spec_leave:
+        st.error("Please pick only one type of leave.")
+    elif not auth_leave and not spec_leave:
+        st.error("Don't forget to select a leave type!")
+    else:
+        leave_type_sel = True
+
+    reason = st.text_area("Why are you requesting leave?", height=100)
+    if reason:
+        st.info("Your reason will be reviewed by your mentor.")
+    else:
+        st.warning("Please provide a reason for your leave.")
+
+    st.subheader("Your Branch and Batch")
+    directory = get_directory().current()
+    sel_branch = st.selectbox("Choose your Branch:", directory.branches, index=0) 
+
+    batches = directory.batches_for(sel_branch)
+
+    sel_batch = None 
+    if not batches:
+        st.warning("First, pick your branch to see your batch options.")
+    else:
+        sel_batch = st.selectbox("Choose your Batch:", batches)
+        if sel_batch:
+            st.write(f"You're in batch: **{sel_batch}**, from the **{sel_branch}** branch.")
+        else:
+            st.info("Please select your batch.")
+
+    st.subheader("Your Mentor's Details")
+
+    sel_mentor = directory.mentor_for(sel_batch) 
+    st.text_input("Your Mentor:", value=sel_mentor or "", disabled=True)
+
+    mentor_verified = False
+    if sel_batch and sel_mentor:
+        st.success("Mentor and batch details look good!")
+        mentor_verified = True
+    elif sel_batch:
+        st.error(f"Hmm, batch '{sel_batch}' doesn't have a mentor assigned yet. Please contact the hostel office.")
+    else:
+        st.warning("Please pick your batch to see your mentor.")
+
+    st.subheader("When are you applying for leave? 📅")
+    today = datetime.date.today()
+    s_date = st.date_input("Leave From:", today) 
+    e_date = st.date_input("Till:", max(today, s_date)) 
+
+    num_days = 0
+    date_range_valid = False
+    if s_date > e_date:
+        st.error("The 'End' date must be after or on the 'From' date.")
+    else:
+        num_days = (e_date - s_date).days + 1
+        st.success(f"You're applying for **{num_days}** day(s) of leave.")
+        date_range_valid = True
+
+    if num_days > 5:
+        st.warning("For leaves longer than 5 days, permission from a higher authority might be needed.")
+
+    st.write("---")
+    if st.button("Submit My Leave Request"):
+        if all([
+            s_name, s_id, attn is not None, yr_valid, sel_branch, sel_batch,
+            email, sel_mentor, reason,
+            leave_type_sel, date_range_valid, mentor_verified, num_days > 0
+        ]):
+            with metrics.timed("filter.duplicate_check"):
+                is_dup = not get_store().overlapping_pending(s_id, s_date, e_date, reason).empty
+
+            if is_dup:
+                st.warning("Hold on! You already have a similar pending leave request for these dates and reason. Please wait for your previous request to be processed by your teacher.")
+            else:
+                new_req = {
+                    "student_name": s_name,
+                    "attendance": attn,
+                    "year": yr,
+                    "student_id": s_id,
+                    "branch": sel_branch,
+                    "batch": sel_batch,
+                    "email": email,
+                    "leave_days": num_days,
+                    "start_date": s_date.isoformat(),
+                    "end_date": e_date.isoformat(),
+                    "reason": reason,
+                    "teacher": sel_mentor,
+                    "status": LEAVE_STATUS_PENDING,
+                    "qr_code_data": None
+                }
+                if save_leave_request(new_req):
+                    st.success("Great! Your leave request has been submitted. Please wait for your teacher's approval.")
+                else:
+                    st.error("Oh no! Couldn't save your request. Something went wrong.")
+        else:
+            st.error("Almost there! Please fill in all the required details correctly and fix any warnings or errors before submitting.")
+
+    st.write("---")
+    st.subheader("Your Leave Request Status and Gate Pass")
+    if s_id:
+        s_hist, s_total = paged_view("s_hist", "student", s_id, ['start_date', 'end_date', 'status', 'leave_days'],
+                                     title="### Your Leave Request History:")
+
+        if s_total:
+            st.dataframe(s_hist[['start_date', 'end_date', 'leave_days', 'reason', 'status', 'teacher']], column_config=DATE_COLUMN_CONFIG)
+
+            with metrics.timed("filter.active_pass"):
+                active_granted_reqs = get_store().active_pass(s_id, today) # Shortened: active_granted_requests -> active_granted_reqs
+
+            if not active_granted_reqs.empty:
+                current_active_req = active_granted_reqs.iloc[[0]] 
+
+                if pd.notna(current_active_req["qr_code_data"].iloc(0)[0]):
+                    st.success(f"Good news! Your leave request for **{fmt_date(current_active_req['start_date'].iloc(0)[0])}** to **{fmt_date(current_active_req['end_date'].iloc(0)[0])}** has been **GRANTED!** This pass is valid until **{fmt_date(current_active_req['end_date'].iloc(0)[0])}**.")
+                    st.subheader("Here's Your Active Gate Pass:")
+                    try:
+                        from app import qr  # qrcode and PIL load only once someone has a pass to show
+                        qr_data = current_active_req["qr_code_data"].iloc(0)[0]
+                        qr_bytes = qr.gate_pass_png(qr_data, box_size=qr.STUDENT_BOX_SIZE) 
+                        st.image(qr_bytes, caption="Your Approved Leave Gate Pass", use_container_width=False) 
+                        st.download_button(
+                            label="Download Your Gate Pass QR Code",
+                            data=qr_bytes,
+                            file_name=f"gatepass_{s_id}_{fmt_date(current_active_req['start_date'].iloc(0)[0])}.png",
+                            mime="image/png",
+                        )
+                    except Exception as e:
+                        st.error(f"Something went wrong displaying your QR code: {e}. Please contact your teacher or administrator.")
+                else:
+                    st.info("Your leave request is approved, but the QR code data seems to be missing. Please talk to your teacher.")
+            else:
+                st.info("No active or future approved leave requests found for your Student ID. Your previous passes have expired or none are pending.")
+        else:
+            st.info("No leave requests found for your Student ID. Submit one above!")
+    else:
+        st.info("Enter your Student ID above to check your leave status and get your pass.")
@@ -0,0 +1,204 @@
+import datetime
+import io
+
+import pandas as pd
+import streamlit as st
+
+from app import gatepass, metrics, storage
+from app.common import (
+    DATE_COLUMN_CONFIG, LEAVE_STATUS_GRANTED, LEAVE_STATUS_REJECTED, LEAVE_STATUS_REVOKED, fmt_date, get_store,
+    live_view, paged_view,
+)
+
+POLL_SECONDS = 10 # how often an open teacher queue checks the change feed
+
+
+def _select_all(selected, req_ids):
+    if st.session_state.bulk_select_all:
+        selected.update(req_ids)
+    else:
+        selected.difference_update(req_ids)
+
+
+def bulk_review(pending_reqs):
+    f_col1, f_col2 = st.columns(2)
+    with f_col1:
+        sel_batches = st.multiselect("Filter by batch", sorted(pending_reqs["batch"].dropna().unique()), key="bulk_batches")
+    with f_col2:
+        date_range = st.date_input("Leave starting between", value=(), key="bulk_dates")
+
+    with metrics.timed("filter.bulk_review"):
+        view = pending_reqs
+        if sel_batches:
+            view = view.loc[view["batch"].isin(sel_batches)]
+        if len(date_range) == 2:
+            view = view.loc[view["start_date"].between(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))]
+    if view.empty:
+        st.info("No pending requests match these filters.")
+        return
+
+    # Ticks live in session state by req_id and are re-applied each run: the editor is rebuilt
+    # whenever its rows change (a poll brought in a request), and would forget them otherwise
+    selected = st.session_state.setdefault("bulk_selected", set())
+    selected.intersection_update(pending_reqs["req_id"])
+    st.checkbox(f"Select all {len(view)} shown", key="bulk_select_all",
+                on_change=_select_all, args=(selected, list(view["req_id"])))
+    table = view[['student_name', 'student_id', 'batch', 'start_date', 'end_date', 'leave_days', 'reason', 'attendance']].copy()
+    table.insert(0, "select", view["req_id"].isin(selected).to_numpy())
+    edited = st.data_editor(table, hide_index=True, key="bulk_editor",
+                            column_config={"select": st.column_config.CheckboxColumn("Select"), **DATE_COLUMN_CONFIG},
+                            disabled=[col for col in table.columns if col != "select"])
+    ticked = edited["select"].to_numpy(dtype=bool)
+    selected.difference_update(view["req_id"])
+    selected.update(view["req_id"][ticked])
+    chosen = view.loc[ticked]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        approve = st.button(f"✅ Approve all selected ({len(chosen)})", key="bulk_approve", disabled=chosen.empty)
+    with col2:
+        reject = st.button(f"❌ Reject all selected ({len(chosen)})", key="bulk_reject", disabled=chosen.empty)
+
+    if approve:
+        from app import qr  # qrcode and PIL load on the first approval, not with the page
+        qr_payloads = gatepass.build_payloads(chosen)
+        get_store().set_statuses(zip(chosen["req_id"], [LEAVE_STATUS_GRANTED] * len(chosen), qr_payloads))
+        qr.prerender_gate_passes(qr_payloads)  # in the background; the rerun doesn't wait for it
+        selected.difference_update(chosen["req_id"])
+        st.success(f"Leave granted for {len(chosen)} request(s)! Their gate passes are ready on the students' pages.")
+        st.rerun()
+    if reject:
+        get_store().set_statuses((req_id, LEAVE_STATUS_REJECTED, None) for req_id in chosen["req_id"])
+        selected.difference_update(chosen["req_id"])
+        st.warning(f"Rejected {len(chosen)} leave request(s).")
+        st.rerun()
+
+
+def revoke_passes(curr_t_name):
+    with st.expander("⛔ Revoke a gate pass"):
+        # expanders run their body even when closed, so the query waits for this toggle
+        if not st.toggle("Show my students' valid passes", key="revoke_open"):
+            return
+        passes = get_store().teacher_passes(curr_t_name, datetime.date.today())
+        if passes.empty:
+            st.info("None of your students has a gate pass that's still valid.")
+            return
+        labels = {row.req_id: f"{row.student_id} {row.student_name}: {row.start_date:%Y-%m-%d} to {row.end_date:%Y-%m-%d}"
+                  for row in passes.itertuples(index=False)}
+        req_id = st.selectbox("Pass", list(labels), format_func=labels.get, key="revoke_choice")
+        if st.button("Revoke this pass", key="revoke_pass"):
+            # the gate's index drops it on its next scan; the QR text stays on the row for the record
+            get_store().set_status(req_id, LEAVE_STATUS_REVOKED, passes.loc[passes["req_id"] == req_id, "qr_code_data"].iloc[0])
+            st.warning(f"Revoked the gate pass for {labels[req_id]}.")
+
+
+def export_passes(curr_t_name=None):
+    # one mentor's passes, or with no mentor (the admin page) the whole campus's
+    with st.expander("🖨️ Export gate passes"):
+        today = datetime.date.today()
+        date_range = st.date_input("Passes valid between", value=(today, today), key="export_dates")
+        fmt = st.radio("Format", ["zip", "pdf"], horizontal=True, key="export_format",
+                       format_func=lambda f: "ZIP of PNGs" if f == "zip" else "Printable PDF")
+        if st.button("Prepare gate passes", key="export_prepare") and len(date_range) == 2:
+            reqs = get_store().granted_between(date_range[0], date_range[1], teacher=curr_t_name)
+            if reqs.empty:
+                st.info("No granted leave in that date range.")
+                return
+            from app import export
+            buf = io.BytesIO()
+            with st.spinner(f"Rendering {len(reqs)} gate passes..."):
+                stats = export.export_gate_passes(reqs, buf, fmt=fmt)
+            st.success(f"Rendered {stats['passes']} gate passes in {stats['seconds']:.2f}s ({stats['per_second']:.1f} passes/s).")
+            st.download_button(
+                label="Download gate passes",
+                data=buf.getvalue(),
+                file_name=f"gatepasses_{date_range[0]}_{date_range[1]}.{fmt}",
+                mime="application/zip" if fmt == "zip" else "application/pdf",
+            )
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def pending_queue(curr_t_name):
+    # Reruns on its own every few seconds; only what changed since the last run is fetched
+    with metrics.timed("changefeed.refresh"):
+        live, joined = live_view("teacher_pending", curr_t_name)
+    if joined:
+        st.toast(f"📬 {len(joined)} new leave request(s) just arrived.")
+
+    if st.toggle("Bulk review mode", key="bulk_mode"):
+        pending_reqs = live.frame
+        if pending_reqs.empty:
+            st.info("Great news! No pending leave requests for you at the moment.")
+        else:
+            bulk_review(pending_reqs)
+        pending_total = None
+    else:
+        pending_reqs, pending_total = paged_view("t_pending", "teacher_pending", curr_t_name, ['start_date', 'end_date', 'batch', 'student_name', 'leave_days'], live=live)
+
+    if pending_total:
+        for original_index, req in pending_reqs.iterrows(): 
+            with st.container(border=True):
+                st.info(f"**Student Name:** {req['student_name']}\n"
+                        f"**Student ID:** {req['student_id']}\n"
+                        f"**Branch/Batch:** {req['branch']}/{req['batch']}\n"
+                        f"**Leave Days:** {req['leave_days']} ({fmt_date(req['start_date'])} to {fmt_date(req['end_date'])})\n"
+                        f"**Reason:** {req['reason']}\n"
+                        f"**Requested Teacher:** {req['teacher']}\n"
+                        f"**Attendance:** {req['attendance']}%")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button(f"✅ Approve {req['student_id']}", key=f"approve_{req['student_id']}_{req['req_id']}"):
+                        qr_data = gatepass.build_payloads(pending_reqs.loc[[original_index]]).iloc[0]
+
+                        get_store().set_status(req["req_id"], LEAVE_STATUS_GRANTED, qr_data)
+                        st.success(f"Leave granted for Student ID: {req['student_id']}! QR code generated and ready.")
+                        try:
+                            from app import qr
+                            qr_bytes = qr.gate_pass_png(qr_data)
+                            qr.prerender_gate_passes([qr_data])
+                            st.subheader("Generated Gate Pass Preview:")
+                            st.image(qr_bytes, caption=f"QR Code for {req['student_id']}", use_container_width=True)
+                            st.download_button(
+                                label="Download Gate Pass QR Code",
+                                data=qr_bytes,
+                                file_name=f"gatepass_{req['student_id']}_{fmt_date(req['start_date'])}.png",
+                                mime="image/png",
+                            )
+                        except Exception as e:
+                            st.error(f"Oops! Couldn't display the QR code preview: {e}. But the leave is still granted.")
+                        st.rerun()
+
+                with col2:
+                    if st.button(f"❌ Reject {req['student_id']}", key=f"reject_{req['student_id']}_{req['req_id']}"):
+                        get_store().set_status(req["req_id"], LEAVE_STATUS_REJECTED)
+                        st.warning(f"Leave rejected for Student ID: {req['student_id']}.")
+                        st.rerun()
+    elif pending_total == 0:
+        st.info("Great news! No pending leave requests for you at the moment.")
+
+
+def teacher_page():
+    curr_t_name = st.session_state.get("T_NAME") 
+    if curr_t_name:
+        st.title(f"Welcome, {curr_t_name} (Teacher Portal)!")
+    else:
+        st.title("Welcome to the Teacher Portal!")
+
+    st.write("---")
+
+    st.subheader("Pending Leave Requests (Awaiting Your Review)")
+    pending_queue(curr_t_name)
+
+    st.write("---")
+    export_passes(curr_t_name)
+    revoke_passes(curr_t_name)
+
+    st.subheader("Your Approved/Rejected Leave Requests History")
+    t_hist_reqs, t_hist_total = paged_view("t_hist", "teacher_history", curr_t_name, ['start_date', 'end_date', 'status', 'batch', 'student_name']) 
+
+    if t_hist_total:
+        st.dataframe(t_hist_reqs.drop(columns=storage.DERIVED_COLUMNS), column_config=DATE_COLUMN_CONFIG)
+        st.info("Just a note: QR code images show up when a request is approved or on the student's page, not directly within this table. The 'QR Code Data' column shows the text inside the QR.")
+    else:
+        st.info("No approved or rejected leave requests found for you yet.")
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from app import directory as campus_directory
+from app import storage
+
+REASONS = ["Going home", "Medical appointment", "Family function", "Sports meet", "Festival", "Internship interview"]
+
+
+def generate(rows, seed=0, directory_path=campus_directory.DIRECTORY_FILE, start="2024-01-01", days=730):
+    """
+    `rows` synthetic leave requests shaped like the real file: students spread over the
+    campus directory's batches (with their real mentors), a few requests per student,
+    about a quarter still pending, and some exact repeats for the duplicate scan to find.
+    """
+    rng = np.random.default_rng(seed)
+    index = campus_directory.Directory(directory_path).current()
+    batches = np.array(list(index.batch_branch))
+    branches = np.array([index.batch_branch[b] for b in batches])
+    mentors = np.array([index.batch_mentor[b] for b in batches])
+
+    n_students = max(1, rows // 4)
+    student = rng.integers(0, n_students, rows)
+    student_batch = rng.integers(0, len(batches), n_students)[student]
+    leave_days = rng.integers(1, 8, rows)
+    start_dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit="D")
+    status = rng.choice([storage.LEAVE_STATUS_PENDING, storage.LEAVE_STATUS_GRANTED, storage.LEAVE_STATUS_REJECTED],
+                        rows, p=[0.25, 0.6, 0.15])
+    ids = pd.Series(student).map("{:08d}".format)
+
+    df = pd.DataFrame({
+        "student_name": "Student " + ids,
+        "attendance": rng.uniform(60, 100, rows).round(1),
+        "year": rng.integers(1, 5, rows).astype(str),
+        "student_id": "7000" + ids,
+        "branch": branches[student_batch],
+        "batch": batches[student_batch],
+        "email": "s" + ids + "@example.com",
+        "leave_days": leave_days,
+        "start_date": start_dates.strftime("%Y-%m-%d"),
+        "end_date": (start_dates + pd.to_timedelta(leave_days - 1, unit="D")).strftime("%Y-%m-%d"),
+        "reason": rng.choice(REASONS, rows),
+        "teacher": mentors[student_batch],
+        "status": status,
+        "qr_code_data": None,
+        "req_id": [f"{i:012x}" for i in rng.integers(0, 2 ** 48, rows)],
+    })
+    # submitted up to two weeks ahead of the leave, decided within three days
+    submitted = start_dates - pd.to_timedelta(rng.integers(3600, 14 * 86400, rows), unit="s")
+    decided = submitted + pd.to_timedelta(rng.integers(600, 3 * 86400, rows), unit="s")
+    df["submitted_at"] = submitted.strftime("%Y-%m-%dT%H:%M:%S")
+    df["decided_at"] = pd.Series(decided.strftime("%Y-%m-%dT%H:%M:%S")).where(status != storage.LEAVE_STATUS_PENDING)
+    granted = df["status"] == storage.LEAVE_STATUS_GRANTED
+    df.loc[granted, "qr_code_data"] = (
+        "LEAVE_GRANTED_ID:" + df["student_id"] + "|NAME:" + df["student_name"]
+        + "|FROM:" + df["start_date"] + "|TO:" + df["end_date"] + "|TS:1700000000.0"
+    )[granted]
+
+    # ~1% repeats of an earlier pending request, the case the duplicate check exists for
+    pending = np.flatnonzero(df["status"] == storage.LEAVE_STATUS_PENDING)
+    if len(pending):
+        repeats = rng.choice(pending, max(1, rows // 100))
+        targets = rng.choice(rows, len(repeats), replace=False)
+        copied = df.iloc[repeats].drop(columns="req_id").to_numpy()
+        df.loc[df.index[targets], [c for c in storage.COLUMNS if c != "req_id"]] = copied
+    return df
+
+
+def write_dataset(path, rows, seed=0, directory_path=campus_directory.DIRECTORY_FILE):
+    df = generate(rows, seed=seed, directory_path=directory_path)
+    df.to_csv(path, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic leave_request.csv")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=storage.DATABASE)
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows} leave requests to {args.output}")
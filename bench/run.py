@@ -0,0 +1,206 @@
+"""
+Times the leave workflow's hot paths against synthetic datasets and prints one JSON
+document with latency percentiles per operation, so runs before and after a storage
+or caching change can be diffed.
+
+    python -m bench.run --rows 10000 100000 --backend journal sqlite -o bench.json
+"""
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from app import auth, changefeed, dedupe, gatepass, qr, storage
+from app import directory as campus_directory
+from bench import datagen
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def open_store(backend):
+    return storage.open_store(backend, path=storage.DATABASE)
+
+
+def bench_dataset(df, backend, iterations, cold_loads, rng):
+    """Every store operation the app performs, against the dataset in the working directory."""
+    results = {}
+    started = time.perf_counter()
+    store = open_store(backend)  # sqlite imports the CSV here; both count it into fresh rollups
+    results["open"] = summarize([time.perf_counter() - started])
+    results["load_cold"] = timed(lambda: open_store(backend).load(), [()] * cold_loads)
+    results["load_warm"] = timed(store.load, [()] * iterations)
+
+    teachers = rng.choice(df["teacher"].unique(), iterations)
+    some_reqs = df.sample(iterations, replace=True, random_state=int(rng.integers(2 ** 31)))
+    overlap_args = [
+        (row.student_id, datetime.date.fromisoformat(row.start_date), datetime.date.fromisoformat(row.end_date), row.reason)
+        for row in some_reqs.itertuples(index=False)
+    ]
+    results["duplicate_check"] = timed(store.overlapping_pending, overlap_args)
+    results["teacher_pending"] = timed(store.teacher_pending, [(t,) for t in teachers])
+    results["teacher_pending_page"] = timed(
+        lambda t: store.page("teacher_pending", t, offset=0, limit=25, sort_by="start_date"), [(t,) for t in teachers])
+    results["duplicate_scan"] = timed(
+        lambda: dedupe.find_duplicates(store.load(), [storage.LEAVE_STATUS_PENDING]), [()] * max(1, cold_loads))
+
+    # Another session's view of one mentor's queue, caught up after each write below
+    live = changefeed.LiveView(open_store(backend), "teacher_pending", teachers[0])
+    live_samples = []
+    new_rows = datagen.generate(iterations, seed=int(rng.integers(2 ** 31))).assign(status=storage.LEAVE_STATUS_PENDING)
+    append_samples = []
+    for row in new_rows.drop(columns="req_id").to_dict("records"):
+        started = time.perf_counter()
+        store.append(row)
+        append_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        live.refresh()
+        live_samples.append(time.perf_counter() - started)
+    results["append"] = summarize(append_samples)
+    results["live_refresh"] = summarize(live_samples)
+
+    pending = store.load().loc[lambda d: d["status"] == storage.LEAVE_STATUS_PENDING]
+    chosen = pending.take(rng.choice(len(pending), min(iterations, len(pending)), replace=False))
+    passes = gatepass.build_payloads(chosen)
+    decisions = [
+        (req_id, storage.LEAVE_STATUS_GRANTED, payload) if i % 2 == 0 else (req_id, storage.LEAVE_STATUS_REJECTED, None)
+        for i, (req_id, payload) in enumerate(zip(chosen["req_id"], passes))
+    ]
+    results["set_status"] = timed(store.set_status, decisions)
+
+    # The synthetic leave is all in the past, so the gate's "today" is the dataset's first day
+    gate_day = store.load()["start_date"].min().date()
+    results["gate_index_build"] = timed(lambda: gatepass.PassIndex(store, gate_day), [()] * cold_loads)
+    index = gatepass.PassIndex(store, gate_day)
+    scans = [(payload, index, gate_day) for _, _, payload in decisions if payload] * 10
+    results["gate_verify"] = timed(gatepass.verify, scans)
+    results["analytics_counts"] = timed(store.rollups.counts, [(by,) for by in ("branch", "batch", "teacher")] * iterations)
+    results["analytics_latency"] = timed(store.rollups.latency, [()] * iterations)
+    results["rollup_rebuild"] = timed(lambda: store.rollups.rebuild(store.load_all()), [()] * cold_loads)
+
+    history_args = [(t,) for t in teachers]
+    history_page = lambda t: store.page("teacher_history", t, offset=0, limit=25, sort_by="start_date")
+    student_args = [(s,) for s in some_reqs["student_id"]]
+    student_page = lambda s: store.page("student", s, offset=0, limit=25, sort_by="start_date")
+    results["teacher_history_page"] = timed(history_page, history_args)
+    results["student_history_page"] = timed(student_page, student_args)
+    results["archive"] = timed(lambda: store.archive_decided(datetime.date.today()), [()])
+    results["load_cold_archived"] = timed(lambda: open_store(backend).load(), [()] * cold_loads)
+    results["teacher_history_page_archived"] = timed(history_page, history_args)
+    results["student_history_page_archived"] = timed(student_page, student_args)
+    return results
+
+
+def bench_qr(iterations):
+    payloads = [f"LEAVE_GRANTED_ID:7000{i:08d}|NAME:Student {i:08d}|FROM:2025-01-01|TO:2025-01-03|TS:{i}"
+                for i in range(iterations)]
+    args = [(p, qr.PREVIEW_BOX_SIZE) for p in payloads]
+    results = {"qr_render": timed(lambda p, size: qr.image_to_bytes(qr.generate_qr_code(p, box_size=size)), args)}
+    results["qr_first_serve"] = timed(qr.gate_pass_png, args)  # render + write to the disk cache
+    qr.gate_pass_png.cache_clear()
+    results["qr_disk_hit"] = timed(qr.gate_pass_png, args)
+    results["qr_memory_hit"] = timed(qr.gate_pass_png, args)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the leave workflow on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backend", choices=["journal", "sqlite"], nargs="+", default=["journal", "sqlite"])
+    parser.add_argument("--iterations", type=int, default=200, help="samples per cheap operation")
+    parser.add_argument("--cold-loads", type=int, default=5, help="samples per full reload / full scan")
+    parser.add_argument("--sessions", type=int, default=0, help="concurrent AppTest sessions to simulate (0 = skip)")
+    parser.add_argument("--session-rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="where datasets are written (default: a temp dir)")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    directory_path = os.path.join(REPO_DIR, campus_directory.DIRECTORY_FILE)
+
+    report = {
+        "meta": {
+            "started": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "runs": [],
+    }
+    root = args.workdir or tempfile.mkdtemp(prefix="leave_bench_")
+    cwd = os.getcwd()
+    try:
+        for rows in args.rows:
+            df = datagen.generate(rows, seed=args.seed, directory_path=directory_path)
+            for backend in args.backend:
+                run_dir = os.path.join(root, f"{backend}_{rows}")
+                shutil.rmtree(run_dir, ignore_errors=True)  # no journal or database left from an earlier run
+                os.makedirs(run_dir)
+                # Each run is a deployment of its own: the app finds its files relative to cwd
+                for name in (campus_directory.DIRECTORY_FILE, auth.CREDENTIALS_FILE):
+                    shutil.copy(os.path.join(REPO_DIR, name), run_dir)
+                os.chdir(run_dir)
+                os.environ["LEAVE_STORE"] = backend
+                os.environ["LEAVE_SQLITE_PATH"] = os.path.join(run_dir, storage.SQLITE_DATABASE)
+                df.to_csv(storage.DATABASE, index=False)
+                rng = np.random.default_rng(args.seed)
+                run = {"rows": rows, "backend": backend,
+                       "results": bench_dataset(df, backend, args.iterations, args.cold_loads, rng)}
+                if args.sessions:
+                    from bench import sessions
+                    by_kind = sessions.run_sessions(args.sessions, args.session_rounds, df, rng)
+                    run["results"].update((kind, summarize(seconds)) for kind, seconds in sorted(by_kind.items()))
+                report["runs"].append(run)
+        os.chdir(root)
+        report["qr"] = bench_qr(args.iterations)
+    finally:
+        os.chdir(cwd)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import datetime
+import multiprocessing
+import os
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "harsh.py")
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def _run(at, samples, kind):
+    started = time.perf_counter()
+    at.run()
+    samples.append((kind, time.perf_counter() - started))
+    if at.exception:
+        raise RuntimeError(f"{kind}: {at.exception[0].value}")
+
+
+def teacher_session(teacher, rounds, samples):
+    """A mentor opening the portal, then the queue being polled / re-rendered `rounds` times."""
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.session_state.LI_AS = "teacher"
+    at.session_state.T_NAME = teacher
+    _run(at, samples, "session_teacher_open")
+    for _ in range(rounds):
+        _run(at, samples, "session_teacher_rerun")
+    approve = [b for b in at.button if b.key and b.key.startswith("approve_")]
+    if approve:
+        approve[0].click()
+        _run(at, samples, "session_teacher_approve")
+
+
+def student_session(student, rounds, samples):
+    """A student filling in the form and submitting `rounds` leave requests for different days."""
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.session_state.LI_AS = "student"
+    _run(at, samples, "session_student_open")
+    _widget(at.text_input, "Enter your full name").set_value(f"Student {student}")
+    _widget(at.text_input, "Enter your student ID").set_value(student)
+    _widget(at.text_input, "Which year are you in (e.g., 1, 2, 3, 4)?").set_value("2")
+    _widget(at.text_input, "Your Email ID:").set_value(f"{student}@example.com")
+    _widget(at.checkbox, "Authorized Leave").check()
+    _widget(at.text_area, "Why are you requesting leave?").set_value("Going home")
+    _run(at, samples, "session_student_fill")
+    for i in range(rounds):
+        day = datetime.date.today() + datetime.timedelta(days=30 + 7 * i)
+        _widget(at.date_input, "Leave From:").set_value(day)
+        _widget(at.date_input, "Till:").set_value(day)
+        _widget(at.button, "Submit My Leave Request").click()
+        _run(at, samples, "session_student_submit")
+
+
+def _session(role, who, rounds, barrier, results):
+    samples = []
+    try:
+        barrier.wait()  # everyone starts together, after the slow imports
+        (teacher_session if role == "teacher" else student_session)(who, rounds, samples)
+        results.put((samples, None))
+    except Exception as e:
+        results.put((samples, f"{role} {who}: {e!r}"))
+
+
+def run_sessions(n_sessions, rounds, df, rng):
+    """
+    `n_sessions` AppTest sessions at once against the app in the working directory, half
+    mentors and half students. AppTest keeps one global runtime per process, so each
+    session gets its own process: they share the data files, as server replicas would,
+    but not st.cache_resource. Returns {kind of rerun: [seconds, ...]}.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(n_sessions), ctx.Queue()
+    teachers = rng.choice(df["teacher"].unique(), n_sessions)
+    students = rng.choice(df["student_id"].unique(), n_sessions)
+    procs = [
+        ctx.Process(target=_session, args=("teacher", teachers[i], rounds, barrier, results)) if i % 2 == 0
+        else ctx.Process(target=_session, args=("student", students[i], rounds, barrier, results))
+        for i in range(n_sessions)
+    ]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    errors = [error for _, error in outcomes if error]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    by_kind = {}
+    for samples, _ in outcomes:
+        for kind, seconds in samples:
+            by_kind.setdefault(kind, []).append(seconds)
+    return by_kind
@@ -0,0 +1,24 @@
+import pytest
+
+from app import storage
+
+
+@pytest.fixture
+def make_row():
+    """Build a submitted leave request; keyword arguments override any field."""
+    def make(**fields):
+        row = {
+            "student_name": "Test Student", "attendance": 90.0, "year": "2", "student_id": "700000000001",
+            "branch": "BTECH CS", "batch": "A1", "email": "student@example.com", "leave_days": 2,
+            "start_date": "2030-01-01", "end_date": "2030-01-02", "reason": "family function",
+            "teacher": "Sugam Shivare", "status": storage.LEAVE_STATUS_PENDING,
+        }
+        row.update(fields)
+        return row
+    return make
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """Where a test's journal store keeps its snapshot; the journal and lock sit next to it."""
+    return str(tmp_path / storage.DATABASE)
@@ -0,0 +1,67 @@
+import json
+import time
+
+import pytest
+
+from app import auth
+
+
+@pytest.fixture
+def credentials(tmp_path):
+    path = tmp_path / "credentials.json"
+    users = {"mentor": {"role": "teacher", "name": "Mentor", **auth.hash_password("right")}}
+    path.write_text(json.dumps({"users": users}), encoding="utf-8")
+    return auth.CredentialStore(str(path))
+
+
+def test_login_checks_password_and_role(credentials):
+    assert credentials.verify("mentor", "right", "teacher", "ip1")[0]["name"] == "Mentor"
+    assert credentials.verify("mentor", "wrong", "teacher", "ip1") == (None, 0)
+    assert credentials.verify("mentor", "right", "admin", "ip1") == (None, 0)
+    assert credentials.verify("nobody", "right", "teacher", "ip1") == (None, 0)
+
+
+def test_unknown_id_costs_a_hash(credentials):
+    def slowest(user_id):
+        return min(_timed(credentials.verify, user_id, f"guess{i}", "teacher") for i in range(3))
+
+    assert slowest("nobody") > slowest("mentor") / 3
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def test_failures_lock_out_the_client_not_the_account(credentials):
+    for _ in range(credentials.limiter.max_failures):
+        credentials.verify("mentor", "wrong", "teacher", "attacker")
+    user, wait = credentials.verify("mentor", "right", "teacher", "attacker")
+    assert user is None and wait > 0
+    assert credentials.verify("mentor", "right", "teacher", "mentor's laptop")[0] is not None
+
+
+def test_a_client_guessing_many_ids_is_limited(credentials):
+    for i in range(credentials.client_limiter.max_failures):
+        credentials.verify(f"user{i}", "guess", "teacher", "attacker")
+    assert credentials.verify("mentor", "right", "teacher", "attacker")[1] > 0
+    # unknown IDs got no buckets of their own
+    assert len(credentials.limiter._failures) == 0
+
+
+def test_limiter_drops_expired_keys_and_stays_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now[0])
+    limiter = auth.RateLimiter(max_failures=2, window=10, max_keys=100)
+    for i in range(500):
+        limiter.failed(f"key{i}")
+    assert len(limiter._failures) == 100
+    assert limiter.retry_after("key0") == 0
+
+    limiter.failed("key499")
+    assert limiter.retry_after("key499") > 0
+    now[0] += 11
+    limiter.failed("fresh")
+    assert list(limiter._failures) == ["fresh"]
+    assert limiter.retry_after("key499") == 0
@@ -0,0 +1,101 @@
+import pytest
+
+from app import changefeed, storage
+
+TEACHER = "Sugam Shivare"
+
+
+@pytest.fixture(params=["journal", "sqlite"])
+def open_store(request, tmp_path):
+    """Open the store a second time the way another server process would."""
+    def open_():
+        if request.param == "journal":
+            return storage.JournalStore(str(tmp_path / storage.DATABASE))
+        return storage.SqliteStore(str(tmp_path / storage.SQLITE_DATABASE), csv_path=None)
+    return open_
+
+
+def test_live_view_follows_writes_from_another_store(open_store, make_row):
+    writer, reader = open_store(), open_store()
+    first = writer.append(make_row(student_id="1"))
+    live = changefeed.LiveView(reader, "teacher_pending", TEACHER)
+    assert list(live.frame.index) == [first]
+
+    assert live.refresh() == []
+    second = writer.append(make_row(student_id="2"))
+    writer.append(make_row(student_id="3", teacher="Someone Else"))
+    assert live.refresh() == [second]
+    writer.set_status(first, storage.LEAVE_STATUS_GRANTED, "LEAVE_GRANTED_ID:1")
+    assert live.refresh() == []
+    assert list(live.frame.index) == [second]
+    assert live.version == reader.version() == writer.version()
+
+
+def test_versions_only_go_up(open_store, make_row):
+    store = open_store()
+    seen = [store.version()]
+    req_id = store.append(make_row())
+    seen.append(store.version())
+    store.set_statuses([(req_id, storage.LEAVE_STATUS_REJECTED, None)])
+    seen.append(store.version())
+    assert seen == sorted(set(seen))
+
+
+def test_changes_since_reports_each_changed_row_once(open_store, make_row):
+    store = open_store()
+    start = store.version()
+    req_id = store.append(make_row(student_id="1"))
+    store.set_status(req_id, storage.LEAVE_STATUS_GRANTED, None)
+    other = store.append(make_row(student_id="2"))
+
+    version, changed = store.changes_since(start)
+    assert version == store.version()
+    assert sorted(changed["req_id"]) == sorted([req_id, other])
+    assert changed.set_index("req_id").loc[req_id, "status"] == storage.LEAVE_STATUS_GRANTED
+    assert store.changes_since(version)[1].empty
+
+
+def test_journal_numbering_continues_across_compaction(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    for i in range(3):
+        store.append(make_row(student_id=str(i)))
+    before = store.version()
+    store.compact()
+    assert store.version() == before
+
+    req_id = store.append(make_row(student_id="3"))
+    assert store.version() == before + 1
+    # the compacted changes are gone from the feed; a reader that far behind must reload
+    assert store.changes_since(before - 1)[1] is None
+    version, changed = store.changes_since(before)
+    assert version == before + 1
+    assert list(changed["req_id"]) == [req_id]
+
+
+def test_live_view_reloads_after_compaction(csv_path, make_row):
+    writer = storage.JournalStore(csv_path)
+    reader = storage.JournalStore(csv_path)
+    kept = writer.append(make_row(student_id="1"))
+    dropped = writer.append(make_row(student_id="2"))
+    live = changefeed.LiveView(reader, "teacher_pending", TEACHER)
+
+    writer.set_status(dropped, storage.LEAVE_STATUS_REJECTED, None)
+    writer.compact()
+    joined = writer.append(make_row(student_id="3"))
+
+    assert live.refresh() == [joined]
+    assert sorted(live.frame.index) == sorted([kept, joined])
+    assert live.version == writer.version()
+
+
+def test_compaction_forced_by_size_keeps_feed_consistent(csv_path, make_row):
+    writer = storage.JournalStore(csv_path, compact_bytes=2048)
+    live = changefeed.LiveView(storage.JournalStore(csv_path), "teacher_pending", TEACHER)
+    expected = []
+    for i in range(30):
+        expected.append(writer.append(make_row(student_id=str(i))))
+        if i % 3 == 0:
+            writer.set_status(expected.pop(0), storage.LEAVE_STATUS_GRANTED, None)
+        live.refresh()
+        assert sorted(live.frame.index) == sorted(expected)
+    assert live.version == writer.version() == 40
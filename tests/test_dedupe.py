@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from app import dedupe, storage
+
+
+@pytest.fixture
+def frame(make_row):
+    """A typed store frame from (req_id, student_id, start, end, reason[, status]) tuples."""
+    def frame(*reqs):
+        rows = [make_row(req_id=req_id, student_id=student_id, start_date=start, end_date=end, reason=reason,
+                         status=status[0] if status else storage.LEAVE_STATUS_PENDING)
+                for req_id, student_id, start, end, reason, *status in reqs]
+        return storage.index_by_id(storage.coerce_frame(pd.DataFrame(rows)))
+    return frame
+
+
+def clusters(dups):
+    """The duplicate groups as sorted req_id lists, whatever numbers they were given."""
+    return sorted(sorted(group) for _, group in dups.groupby("dup_cluster")["req_id"])
+
+
+def test_overlapping_requests_with_the_same_reason_cluster(frame):
+    df = frame(
+        ("a", "s1", "2030-01-01", "2030-01-03", "Trip"),
+        ("b", "s1", "2030-01-03", "2030-01-04", " trip "),  # touches a on its last day
+        ("c", "s1", "2030-01-05", "2030-01-06", "trip"),  # starts after b ends
+        ("d", "s1", "2030-01-02", "2030-01-02", "exam"),  # overlaps a, different reason
+        ("e", "s2", "2030-01-01", "2030-01-03", "trip"),  # same dates, different student
+    )
+    assert clusters(dedupe.find_duplicates(df)) == [["a", "b"]]
+
+
+def test_clusters_chain_through_a_long_request(frame):
+    df = frame(
+        ("long", "s1", "2030-01-01", "2030-01-31", "trip"),
+        ("x", "s1", "2030-01-05", "2030-01-06", "trip"),
+        ("y", "s1", "2030-01-20", "2030-01-21", "trip"),  # doesn't overlap x, but both overlap long
+        ("z", "s1", "2030-02-01", "2030-02-02", "trip"),
+        ("w", "s1", "2030-02-02", "2030-02-03", "trip"),
+    )
+    assert clusters(dedupe.find_duplicates(df)) == [["long", "x", "y"], ["w", "z"]]
+
+
+def test_groups_never_run_into_each_other(frame):
+    # sorted next to each other, but a's end date must not carry over to another student or reason
+    df = frame(
+        ("a", "s1", "2030-01-01", "2030-12-31", "trip"),
+        ("b", "s1", "2030-02-01", "2030-02-02", "umbrella"),
+        ("c", "s2", "2030-02-01", "2030-02-02", "trip"),
+    )
+    assert dedupe.find_duplicates(df).empty
+
+
+def test_status_filter_and_missing_dates(frame):
+    df = frame(
+        ("a", "s1", "2030-01-01", "2030-01-03", "trip"),
+        ("b", "s1", "2030-01-02", "2030-01-04", "trip", storage.LEAVE_STATUS_REJECTED),
+        ("c", "s1", "2030-01-02", "2030-01-04", "trip"),
+        ("d", "s1", None, "2030-01-04", "trip"),
+    )
+    assert clusters(dedupe.find_duplicates(df, [storage.LEAVE_STATUS_PENDING])) == [["a", "c"]]
+    assert clusters(dedupe.find_duplicates(df)) == [["a", "b", "c"]]
+    assert dedupe.find_duplicates(df.iloc[:0]).empty
+
+
+def test_find_overlaps_matches_the_submit_check(frame):
+    df = frame(
+        ("a", "s1", "2030-01-01", "2030-01-03", "Trip"),
+        ("b", "s1", "2030-01-10", "2030-01-12", "trip"),
+        ("c", "s1", "2030-01-02", "2030-01-02", "exam"),
+    )
+    hits = dedupe.find_overlaps(df, pd.Timestamp("2030-01-03"), pd.Timestamp("2030-01-10"), "  TRIP")
+    assert sorted(hits["req_id"]) == ["a", "b"]
+    assert dedupe.find_overlaps(df, pd.Timestamp("2030-01-04"), pd.Timestamp("2030-01-09"), "trip").empty
@@ -0,0 +1,126 @@
+import concurrent.futures
+import datetime
+import multiprocessing
+import threading
+
+import pytest
+
+from app import gatepass, storage
+
+START, END = datetime.date(2030, 1, 1), datetime.date(2030, 1, 2)
+
+
+def _read_secret(threads=1):
+    # Runs in a spawned process, which picks GATEPASS_SECRET_FILE up from the environment.
+    # Its threads all make the first, uncached call at once, like sessions of one server.
+    start = threading.Barrier(threads)
+
+    def read():
+        start.wait()
+        return gatepass._secret()
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        keys = set(pool.map(lambda _: read(), range(threads)))
+    assert len(keys) == 1
+    return keys.pop()
+
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setenv("GATEPASS_SECRET", "test-secret")
+    gatepass._secret.cache_clear()
+    yield
+    gatepass._secret.cache_clear()
+
+
+@pytest.fixture
+def store(csv_path):
+    return storage.JournalStore(csv_path)
+
+
+@pytest.fixture
+def req_id(store, make_row):
+    return store.append(make_row(start_date=START.isoformat(), end_date=END.isoformat()))
+
+
+def grant(store, req_id):
+    payload = gatepass.build_payloads(store.load().loc[[req_id]]).iloc[0]
+    store.set_status(req_id, storage.LEAVE_STATUS_GRANTED, payload)
+    return payload
+
+
+def test_granted_pass_is_valid(store, req_id):
+    payload = grant(store, req_id)
+    ok, reason, row = gatepass.verify(payload, gatepass.PassIndex(store, START), START)
+    assert ok, reason
+    assert row["student_id"] == "700000000001"
+    assert gatepass.parse(payload)["PASS"] == req_id
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda p: p.replace("Test Student", "Someone Else"),
+    lambda p: p.rpartition("|SIG:")[0],
+    lambda p: p[:-1] + ("0" if p[-1] != "0" else "1"),
+    lambda p: p.rpartition("|SIG:")[0] + "|SIG:" + "é" * gatepass.SIGNATURE_CHARS,
+    lambda p: p + "\x00",
+    lambda p: "",
+], ids=["edited", "unsigned", "wrong signature", "non-ascii signature", "trailing garbage", "empty"])
+def test_tampered_or_garbled_pass_is_refused(store, req_id, mangle):
+    payload = mangle(grant(store, req_id))
+    assert gatepass.parse(payload) is None
+    ok, _, row = gatepass.verify(payload, gatepass.PassIndex(store, START), START)
+    assert not ok and row is None
+
+
+def test_pass_signed_with_another_key_is_refused(store, req_id, monkeypatch):
+    payload = grant(store, req_id)
+    monkeypatch.setenv("GATEPASS_SECRET", "another-secret")
+    gatepass._secret.cache_clear()
+    assert not gatepass.verify(payload, gatepass.PassIndex(store, START), START)[0]
+
+
+def test_revoked_pass_is_refused_by_an_open_index(store, req_id):
+    payload = grant(store, req_id)
+    index = gatepass.PassIndex(store, START)
+    assert gatepass.verify(payload, index, START)[0]
+
+    store.set_status(req_id, storage.LEAVE_STATUS_REVOKED, payload)
+    ok, reason, _ = gatepass.verify(payload, index, START)
+    assert not ok
+    assert "revoked" in reason
+
+
+def test_reissued_pass_replaces_the_old_one(store, req_id):
+    old = grant(store, req_id)
+    new = grant(store, req_id)
+    assert new != old  # signed with a later approval timestamp
+    index = gatepass.PassIndex(store, START)
+    assert gatepass.verify(new, index, START)[0]
+    ok, reason, _ = gatepass.verify(old, index, START)
+    assert not ok
+    assert "replaced" in reason
+
+
+def test_pass_outside_its_dates_is_refused(store, req_id):
+    payload = grant(store, req_id)
+    early = START - datetime.timedelta(days=1)
+    ok, reason, _ = gatepass.verify(payload, gatepass.PassIndex(store, early), early)
+    assert not ok and "only valid from" in reason
+
+    late = END + datetime.timedelta(days=1)
+    assert not gatepass.verify(payload, gatepass.PassIndex(store, late), late)[0]
+
+
+@pytest.mark.parametrize("threads", [1, 8])
+def test_generated_key_is_shared_by_processes(tmp_path, monkeypatch, threads):
+    key_file = tmp_path / "gatepass_secret.key"
+    monkeypatch.delenv("GATEPASS_SECRET")
+    monkeypatch.setenv("GATEPASS_SECRET_FILE", str(key_file))
+    monkeypatch.setattr(gatepass, "SECRET_FILE", str(key_file))
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        keys = pool.map(_read_secret, [threads] * 8)
+
+    assert len(set(keys)) == 1
+    assert len(keys[0]) == 64
+    assert gatepass._secret() == keys[0] == key_file.read_bytes().strip()
+    assert [path.name for path in tmp_path.iterdir()] == [key_file.name]  # no temp files left
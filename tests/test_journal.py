@@ -0,0 +1,164 @@
+import json
+import multiprocessing
+import os
+import shutil
+
+import pytest
+
+from app import storage
+
+
+def _append_rows(path, rows):
+    # Runs in a spawned process: a fresh interpreter, so a fresh store and its own lock handle
+    store = storage.JournalStore(path, compact_bytes=4096)
+    return [store.append(row) for row in rows]
+
+
+def _journal_lines(store):
+    with open(store.journal_path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_append_survives_reopen(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    first = store.append(make_row(student_id="1"))
+    second = store.append(make_row(student_id="2"))
+    store.set_status(first, storage.LEAVE_STATUS_GRANTED, "LEAVE_GRANTED_ID:1")
+
+    df = storage.JournalStore(csv_path).load()
+    assert list(df.index) == [first, second]
+    assert df.loc[first, "status"] == storage.LEAVE_STATUS_GRANTED
+    assert df.loc[first, "qr_code_data"] == "LEAVE_GRANTED_ID:1"
+    assert df.loc[second, "status"] == storage.LEAVE_STATUS_PENDING
+
+
+def test_torn_last_line_is_skipped_and_not_glued_onto(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    kept = store.append(make_row(student_id="1"))
+    with open(store.journal_path, "ab") as fh:
+        fh.write(b'{"op": "insert", "row": {"student_id": "torn"')  # a writer died mid-append
+
+    reader = storage.JournalStore(csv_path)
+    assert list(reader.load().index) == [kept]
+
+    added = store.append(make_row(student_id="2"))
+    assert list(storage.JournalStore(csv_path).load().index) == [kept, added]
+    assert store.version() == 2  # numbered past the torn line
+    assert list(reader.load().index) == [kept, added]
+
+
+def test_half_written_line_is_read_once_complete(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    store.append(make_row(student_id="1"))
+    line = json.dumps({"op": "insert", "row": make_row(student_id="2", req_id="late"), "seq": 2}) + "\n"
+    with open(store.journal_path, "a", encoding="utf-8") as fh:
+        fh.write(line[:20])
+    assert "late" not in store.load().index
+
+    with open(store.journal_path, "a", encoding="utf-8") as fh:
+        fh.write(line[20:])
+    assert "late" in store.load().index
+    assert store.version() == 2
+
+
+def test_compaction_keeps_rows_and_numbering(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    ids = [store.append(make_row(student_id=str(i))) for i in range(5)]
+    store.set_status(ids[0], storage.LEAVE_STATUS_REJECTED, None)
+    store.compact()
+
+    assert _journal_lines(store) == [{"op": "base", "seq": 6}]
+    store.append(make_row(student_id="5"))
+    reopened = storage.JournalStore(csv_path)
+    assert reopened.version() == 7
+    df = reopened.load()
+    assert len(df) == 6
+    assert df.loc[ids[0], "status"] == storage.LEAVE_STATUS_REJECTED
+
+
+def test_crash_before_snapshot_replace_loses_nothing(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    ids = [store.append(make_row(student_id=str(i))) for i in range(3)]
+    with open(csv_path + ".tmp", "w", encoding="utf-8") as fh:
+        fh.write("student_name,attendance\nhalf a snap")  # died while writing the new snapshot
+
+    assert list(storage.JournalStore(csv_path).load().index) == ids
+
+
+def test_crash_before_journal_reset_replays_cleanly(csv_path, make_row):
+    store = storage.JournalStore(csv_path)
+    ids = [store.append(make_row(student_id=str(i))) for i in range(3)]
+    store.set_status(ids[1], storage.LEAVE_STATUS_GRANTED, "LEAVE_GRANTED_ID:1")
+    shutil.copy(store.journal_path, csv_path + ".old")
+    store.compact()
+    # The new snapshot landed but the process died before it truncated the journal
+    os.replace(csv_path + ".old", store.journal_path)
+
+    reopened = storage.JournalStore(csv_path)
+    df = reopened.load()
+    assert sorted(df.index) == sorted(ids)
+    assert df.loc[ids[1], "status"] == storage.LEAVE_STATUS_GRANTED
+    assert reopened.version() == 4
+    reopened.append(make_row(student_id="3"))
+    assert len(storage.JournalStore(csv_path).load()) == 4
+
+
+def test_legacy_snapshot_gets_request_ids(csv_path):
+    with open(csv_path, "w", encoding="utf-8") as fh:
+        fh.write("student_name,student_id,start_date,end_date,reason,teacher,status\n"
+                 "Old,1,2020-01-01,2020-01-02,trip,Sugam Shivare,Pending\n")
+    df = storage.JournalStore(csv_path).load()
+    assert len(df) == 1
+    assert df.index[0] and df.index[0] == df["req_id"].iloc[0]
+
+
+def test_compaction_waits_for_the_journal_to_grow_with_the_snapshot(csv_path, make_row, monkeypatch):
+    store = storage.JournalStore(csv_path, compact_bytes=4096)
+    sizes = []  # (journal, old snapshot) at each compaction
+    write_snapshot = store._write_snapshot
+
+    def record(df):
+        sizes.append((os.path.getsize(store.journal_path),
+                      os.path.getsize(csv_path) if os.path.exists(csv_path) else 0))
+        write_snapshot(df)
+
+    monkeypatch.setattr(store, "_write_snapshot", record)
+    ids = []
+    for i in range(300):
+        ids.append(store.append(make_row(student_id=str(i))))
+        with store._compacting:  # let a background compaction finish before the next write
+            pass
+
+    assert len(sizes) >= 3
+    assert all(journal >= max(4096, snapshot * store.COMPACT_RATIO) for journal, snapshot in sizes)
+    assert sizes[-1][0] > 4 * 4096  # the bar rose with the snapshot
+    assert list(storage.JournalStore(csv_path).load().index) == ids
+
+
+@pytest.mark.parametrize("tail_rows", [storage.JournalStore.TAIL_ROWS, 2])
+def test_updates_reach_rows_in_base_and_tail(csv_path, make_row, monkeypatch, tail_rows):
+    monkeypatch.setattr(storage.JournalStore, "TAIL_ROWS", tail_rows)
+    store = storage.JournalStore(csv_path)
+    ids = [store.append(make_row(student_id=str(i))) for i in range(5)]
+    store.load()
+    for req_id in ids:
+        store.set_status(req_id, storage.LEAVE_STATUS_GRANTED, None)
+    df = store.load()
+    assert list(df.index) == ids
+    assert (df["status"] == storage.LEAVE_STATUS_GRANTED).all()
+    assert len(store.view("student", "3")) == 1
+
+
+def test_concurrent_appends_from_processes(csv_path, make_row):
+    storage.JournalStore(csv_path)  # the lock file exists before the workers race for it
+    batches = [[make_row(student_id=f"{worker}{i:03d}") for i in range(40)] for worker in range(4)]
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(len(batches)) as pool:
+        written = pool.starmap(_append_rows, [(csv_path, rows) for rows in batches])
+
+    store = storage.JournalStore(csv_path)
+    df = store.load()
+    assert sorted(df.index) == sorted(req_id for ids in written for req_id in ids)
+    assert df.index.is_unique
+    # every append took the next number, across all the compactions the small limit forced
+    assert store.version() == 160
@@ -0,0 +1,34 @@
+import datetime
+import os
+
+import pytest
+
+from app import qr
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(qr, "CACHE_DIR", str(tmp_path / "gatepass_cache"))
+    qr.gate_pass_png.cache_clear()
+    yield qr.CACHE_DIR
+    qr.gate_pass_png.cache_clear()
+
+
+def payload(n, end="2030-01-02"):
+    return f"LEAVE_GRANTED_ID:{n}|NAME:Test|FROM:2030-01-01|TO:{end}|PASS:p{n}|SIG:0"
+
+
+def test_prerender_fills_the_disk_cache_in_the_background(cache_dir):
+    payloads = [payload(n) for n in range(3)]
+    qr.prerender_gate_passes(payloads).result(timeout=30)
+
+    assert len(os.listdir(os.path.join(cache_dir, "2030-01-02"))) == 2 * len(payloads)
+    qr.gate_pass_png.cache_clear()
+    assert qr.gate_pass_png(payloads[0]) == qr.image_to_bytes(qr.generate_qr_code(payloads[0]))
+
+
+def test_ended_passes_are_evicted_by_day(cache_dir):
+    qr.gate_pass_png(payload(1, end="2030-01-02"))
+    qr.gate_pass_png(payload(2, end="2030-01-05"))
+    assert qr.evict_ended(datetime.date(2030, 1, 3)) == 1
+    assert os.listdir(cache_dir) == ["2030-01-05"]
@@ -0,0 +1,107 @@
+import datetime
+
+import pytest
+
+from app import rollups, storage
+
+PENDING, GRANTED, REJECTED, REVOKED = storage.LEAVE_STATUSES
+TABLES = ["tracked", "status_counts", "latency", "low_attendance"]
+
+
+@pytest.fixture
+def summary(tmp_path):
+    return rollups.Rollups(str(tmp_path / "leave_rollups.db"))
+
+
+@pytest.fixture
+def submit(summary, make_row):
+    def submit(req_id, submitted_at="2030-01-01T09:00:00", **fields):
+        summary.submitted([make_row(req_id=req_id, submitted_at=submitted_at, **fields)])
+    return submit
+
+
+def snapshot(summary):
+    # status_counts rows that fell back to zero are the same as no row at all
+    conn = summary._conn()
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}" + (" WHERE n != 0" if table == "status_counts" else "")))
+            for table in TABLES}
+
+
+def test_submissions_are_counted_per_dimension(summary, submit):
+    submit("a", teacher="T1", batch="A1")
+    submit("b", teacher="T1", batch="A2")
+    submit("c", teacher="T2", batch="A1", submitted_at="2030-01-02T09:00:00")
+
+    assert summary.totals() == {PENDING: 3, GRANTED: 0, REJECTED: 0, REVOKED: 0}
+    assert summary.counts("teacher")["Total"].to_dict() == {"T1": 2, "T2": 1}
+    assert summary.counts("batch")[PENDING].to_dict() == {"A1": 2, "A2": 1}
+    day = summary.counts("day", datetime.date(2030, 1, 2), datetime.date(2030, 1, 31))
+    assert day["Total"].to_dict() == {"2030-01-02": 1}
+
+
+def test_a_resubmitted_request_counts_once(summary, submit):
+    submit("a")
+    submit("a")
+    assert summary.totals()[PENDING] == 1
+
+
+def test_decisions_move_counts_between_statuses(summary, submit):
+    submit("a", teacher="T1")
+    submit("b", teacher="T1")
+    summary.decided([("a", GRANTED, "2030-01-01T10:00:00"), ("b", REJECTED, "2030-01-01T10:00:00")])
+    summary.decided([("a", REVOKED, "2030-01-02T10:00:00")])
+    summary.decided([("b", REJECTED, "2030-01-03T10:00:00")])  # no change
+    summary.decided([("unknown", GRANTED, "2030-01-03T10:00:00")])  # not tracked: ignored
+
+    assert summary.totals() == {PENDING: 0, GRANTED: 0, REJECTED: 1, REVOKED: 1}
+    row = summary.counts("teacher").loc["T1"]
+    assert (row[PENDING], row[GRANTED], row[REJECTED], row[REVOKED], row["Total"]) == (0, 0, 1, 1, 2)
+
+
+def test_latency_counts_first_decisions_only(summary, submit):
+    submit("a", teacher="T1", submitted_at="2030-01-01T08:00:00")
+    submit("b", teacher="T1", submitted_at="2030-01-01T08:00:00")
+    submit("c", teacher="T2", submitted_at="2030-01-01T08:00:00")
+    summary.decided([("a", GRANTED, "2030-01-01T10:00:00"), ("b", REJECTED, "2030-01-01T12:00:00")])
+    summary.decided([("a", REVOKED, "2030-01-05T08:00:00")])  # a revoke isn't a wait for a decision
+
+    latency = summary.latency().set_index("teacher")
+    assert list(latency.index) == ["T1"]
+    assert latency.loc["T1", "decided"] == 2
+    assert latency.loc["T1", "mean_hours"] == 3.0
+    assert latency.loc["T1", "max_hours"] == 4.0
+
+
+def test_low_attendance_keeps_lowest_and_latest(summary, submit):
+    submit("a", student_id="s1", attendance=70, submitted_at="2030-01-01T08:00:00")
+    submit("b", student_id="s1", attendance=75.04, submitted_at="2030-01-02T08:00:00")
+    submit("c", student_id="s2", attendance=rollups.LOW_ATTENDANCE)
+
+    low = summary.low_attendance()
+    assert low[["student_id", "requests", "lowest", "latest", "last_submitted"]].values.tolist() == [
+        ["s1", 2, 70.0, 75.0, "2030-01-02T08:00:00"],
+    ]
+
+
+@pytest.mark.parametrize("backend", ["journal", "sqlite"])
+def test_incremental_rollups_match_a_rebuild(tmp_path, make_row, monkeypatch, backend):
+    # every write an hour after the last, so waits and a later revoke are told apart
+    clock = (datetime.datetime(2030, 1, 1) + datetime.timedelta(hours=h) for h in range(1000))
+    monkeypatch.setattr(storage, "timestamp", lambda: next(clock).isoformat(timespec="seconds"))
+    summary = rollups.Rollups(str(tmp_path / "leave_rollups.db"))
+    if backend == "journal":
+        store = storage.JournalStore(str(tmp_path / storage.DATABASE), rollups=summary)
+    else:
+        store = storage.SqliteStore(str(tmp_path / storage.SQLITE_DATABASE), csv_path=None, rollups=summary)
+    ids = [
+        store.append(make_row(student_id=f"s{i % 4}", teacher=f"T{i % 3}", batch=f"A{i % 2}",
+                              attendance=60 + 3 * i, start_date=f"2030-01-{i + 1:02d}", end_date=f"2030-01-{i + 2:02d}"))
+        for i in range(12)
+    ]
+    store.set_statuses([(req_id, GRANTED if i % 2 else REJECTED, None) for i, req_id in enumerate(ids[:8])])
+    store.set_statuses([(ids[1], REVOKED, None), (ids[3], REVOKED, None)])
+
+    incremental = snapshot(summary)
+    assert summary.rebuild(store.load_all()) == 12
+    assert snapshot(summary) == incremental
+    assert store.load_all().set_index("req_id").loc[ids[1], "decided_at"] == "2030-01-01T12:00:00"
@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+
+from app import storage
+from app.archive import Archive
+
+
+def test_legacy_csv_is_imported_once(tmp_path, csv_path, make_row):
+    legacy = storage.JournalStore(csv_path)
+    req_id = legacy.append(make_row(end_date="2030-01-02"))
+    db_path = str(tmp_path / storage.SQLITE_DATABASE)
+    archive = Archive(str(tmp_path / "archive"))
+
+    store = storage.SqliteStore(db_path, csv_path=csv_path, archive=archive)
+    assert list(store.load()["req_id"]) == [req_id]
+    store.set_status(req_id, storage.LEAVE_STATUS_REJECTED, None)
+    assert store.archive_decided(datetime.date(2030, 2, 1)) == 1
+
+    # the table is empty again, but the CSV was already imported: it stays archived
+    reopened = storage.SqliteStore(db_path, csv_path=csv_path, archive=archive)
+    assert reopened.load().empty
+    assert list(reopened.view("student", "700000000001")["status"]) == [storage.LEAVE_STATUS_REJECTED]
+
+
+def test_database_from_before_the_import_marker_is_not_reimported(tmp_path, csv_path, make_row):
+    storage.JournalStore(csv_path).append(make_row())
+    db_path = str(tmp_path / storage.SQLITE_DATABASE)
+    store = storage.SqliteStore(db_path, csv_path=None)
+    store.set_status(store.append(make_row(student_id="2")), storage.LEAVE_STATUS_GRANTED, None)
+    store._conn().execute("DELETE FROM leave_requests")  # everything archived
+    store._conn().commit()
+
+    assert storage.SqliteStore(db_path, csv_path=csv_path).load().empty
+
+
+def test_rows_are_typed_like_coerce_frame(make_row):
+    rows = [
+        make_row(req_id="a", submitted_at="2030-01-01T09:00:00"),
+        make_row(req_id="b", attendance=None, leave_days=None, end_date=None, status=storage.LEAVE_STATUS_GRANTED,
+                 qr_code_data="LEAVE_GRANTED_ID:1", reason="  Trip ", batch=None),
+        make_row(req_id="c", attendance="n/a", leave_days=2.6, start_date="not a date", qr_code_data="None",
+                 reason=None),
+    ]
+    records = [tuple(row.get(col) for col in storage.COLUMNS) for row in rows]
+    for n in range(len(records) + 1):
+        expected = storage.coerce_frame(pd.DataFrame(records[:n], columns=storage.COLUMNS))
+        pd.testing.assert_frame_equal(storage.frame_from_rows(records[:n]), expected)